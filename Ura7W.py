@@ -26,18 +26,31 @@ from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                             QTabWidget, QCalendarWidget, QMessageBox, 
                             QFileDialog, QCheckBox, QGroupBox, QDialog,
                             QTableWidget, QHeaderView, QStyle, QRadioButton,
-                            QSpinBox, QMenu, QScrollArea, QGridLayout)
+                            QSpinBox, QMenu, QScrollArea, QGridLayout,
+                            QProgressDialog, QTableView, QStyledItemDelegate,
+                            QStyleOptionButton, QStyleOptionComboBox,
+                            QAbstractItemView, QToolTip)
 from PyQt6.QtGui import QAction, QTextCharFormat, QBrush, QColor, QFont, QPen, QIcon
 from PyQt6.QtCore import QSize
-from PyQt6.QtCore import Qt, QDate, QTimer, QThread, pyqtSignal
+from PyQt6.QtCore import (Qt, QDate, QTimer, QThread, pyqtSignal, QAbstractTableModel, QModelIndex,
+                          QEvent, QRect, QSortFilterProxyModel)
 import pandas as pd
+import numpy as np
 from smb.SMBConnection import SMBConnection
+from smb.base import NotConnectedError, SMBTimeout
 import configparser
 import keyboard
 import threading
 import io
 import json
+import gzip
+import hashlib
 import re
+import time
+import uuid
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
 class DateRangeDialog(QDialog):
     def __init__(self, parent=None):
@@ -160,6 +173,367 @@ class DeleteTimestampsDialog(QDialog):
     def get_dates(self):
         return self.start_calendar.selectedDate().toPyDate(), self.end_calendar.selectedDate().toPyDate()
 
+class DataFrameTableModel(QAbstractTableModel):
+    """Table model showing a DataFrame directly, cells are formatted only when the view asks for them"""
+
+    def __init__(self, frame, parent=None):
+        super().__init__(parent)
+        self.frame = frame.reset_index(drop=True)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.frame)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.frame.columns)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        return str(self.frame.iat[index.row(), index.column()])
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return str(self.frame.columns[section])
+        return str(section + 1)
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        """Sort by the column's values, not by their text"""
+        name = self.frame.columns[column]
+        ascending = order == Qt.SortOrder.AscendingOrder
+        self.layoutAboutToBeChanged.emit()
+        try:
+            self.frame = self.frame.sort_values(name, ascending=ascending, kind='stable', na_position='last')
+        except TypeError:
+            # Columns that mix values with text (e.g. times and '') are sorted by their text
+            self.frame = self.frame.sort_values(name, ascending=ascending, kind='stable', key=lambda col: col.map(str))
+        self.frame = self.frame.reset_index(drop=True)
+        self.layoutChanged.emit()
+
+class IconCache:
+    """Icons next to the script, loaded from disk once per process"""
+
+    _icons = {}
+
+    @classmethod
+    def get(cls, filename):
+        """QIcon for the file, None when it is missing or can't be loaded"""
+        if filename not in cls._icons:
+            path = os.path.join(os.path.dirname(os.path.abspath(__file__)), filename)
+            icon = None
+            if os.path.exists(path):
+                try:
+                    icon = QIcon(path)
+                    if icon.isNull():
+                        print(f"Warning: {filename} could not be loaded as icon at {path}")
+                        icon = None
+                except Exception as e:
+                    print(f"Error loading {filename}: {str(e)}")
+                    icon = None
+            else:
+                print(f"Warning: {filename} not found at {path}")
+            cls._icons[filename] = icon
+        return cls._icons[filename]
+
+class EmployeeSearchIndex:
+    """Employee names and card IDs folded for searching: case and diacritics (č, š, ž, ć, đ) ignored"""
+
+    # Letters that NFKD doesn't split into a base letter and a combining mark
+    EXTRA_FOLDS = str.maketrans({'đ': 'd', 'Đ': 'D'})
+
+    def __init__(self):
+        self.folded = {}  # employee id -> (folded name, folded card ID)
+        self.by_card = {}  # folded card ID -> employee row, the model's own row lists
+        self._cache = {}  # text -> folded text, names rarely change between rebuilds
+
+    def fold(self, text):
+        text = text or ''
+        folded = self._cache.get(text)
+        if folded is None:
+            decomposed = unicodedata.normalize('NFKD', text.translate(self.EXTRA_FOLDS))
+            folded = ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+            self._cache[text] = folded
+        return folded
+
+    def rebuild(self, rows):
+        """Index employee rows ([id, name, card_id, ...]) for matches"""
+        self.folded = {row[0]: (self.fold(row[1]), self.fold(row[2])) for row in rows}
+
+    def index_cards(self, rows):
+        """Index the rows by card ID for find_card, edits of these row lists are seen without a rebuild"""
+        self.by_card = {self.fold(row[2]): row for row in rows if row[2]}
+
+    def query_words(self, text):
+        return self.fold(text).split()
+
+    def matches(self, employee_id, words):
+        """Whether every word is contained (also as a prefix) in the employee's name or card ID"""
+        name, card_id = self.folded.get(employee_id, ('', ''))
+        return all(word in name or word in card_id for word in words)
+
+    def find_card(self, card_id):
+        """Employee row with exactly this card ID, None when there is none"""
+        return self.by_card.get(self.fold(card_id))
+
+class EmployeeFilterProxyModel(QSortFilterProxyModel):
+    """Shows the employees matching the search text, using the source model's search index"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.words = []
+
+    def set_query(self, text):
+        words = self.sourceModel().search_index.query_words(text)
+        if words != self.words:
+            self.words = words
+            self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        if not self.words:
+            return True
+        model = self.sourceModel()
+        return model.search_index.matches(model.rows[source_row][0], self.words)
+
+class EmployeeTableModel(QAbstractTableModel):
+    """Employees of the main tab, hours and group are edited through ComboBoxDelegate"""
+
+    # (employee_id, field, value) after the user changed daily_hours or group_id
+    employee_edited = pyqtSignal(int, str, object)
+
+    HEADERS = ["Ime delavca", "ID kartice", "Dnevni delovni čas", "Skupina", "Akcije", "SMB"]
+    HOURS_COLUMN = 2
+    GROUP_COLUMN = 3
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows = []  # [id, name, card_id, daily_hours, group_id, group_name]
+        self.groups = []  # (id, name)
+        self.search_index = EmployeeSearchIndex()
+
+    def set_data(self, employees, groups):
+        """Bring the rows in line with employees (in display order), touching only rows that changed
+        
+        Rows are matched by employee id, so an open editor, the selection and the scroll
+        position survive a sync that changed other employees."""
+        self.groups = list(groups)
+        new_rows = [list(employee) for employee in employees]
+        new_ids = {row[0] for row in new_rows}
+        
+        # Index first, a filter proxy checks the new names while the rows below are patched
+        self.search_index.rebuild(new_rows)
+        
+        # Remove employees that are gone, bottom up so positions stay valid
+        for position in range(len(self.rows) - 1, -1, -1):
+            if self.rows[position][0] not in new_ids:
+                self.beginRemoveRows(QModelIndex(), position, position)
+                del self.rows[position]
+                self.endRemoveRows()
+        
+        for position, new_row in enumerate(new_rows):
+            current = next((i for i in range(position, len(self.rows)) if self.rows[i][0] == new_row[0]), None)
+            if current is None:
+                self.beginInsertRows(QModelIndex(), position, position)
+                self.rows.insert(position, new_row)
+                self.endInsertRows()
+                continue
+            if current != position:
+                # Renamed employees move to their new place in the name order
+                self.beginMoveRows(QModelIndex(), current, current, QModelIndex(), position)
+                self.rows.insert(position, self.rows.pop(current))
+                self.endMoveRows()
+            if self.rows[position] != new_row:
+                # Patched in place, the card index keeps pointing at the model's row
+                self.rows[position][:] = new_row
+                self.dataChanged.emit(self.index(position, 0), self.index(position, len(self.HEADERS) - 1))
+        self.search_index.index_cards(self.rows)
+
+    def hours_options(self):
+        return [("Gibljivi delovni čas", -1)] + [(f"{hours} ur", hours) for hours in range(1, 13)]
+
+    def group_options(self):
+        return [("", None)] + [(name, group_id) for group_id, name in self.groups]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self.rows[index.row()]
+        column = index.column()
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return row[1]
+        if role == Qt.ItemDataRole.EditRole:
+            return row[3] if column == self.HOURS_COLUMN else row[4] if column == self.GROUP_COLUMN else None
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if column == 0:
+            return row[1]
+        if column == 1:
+            return row[2]
+        if column == self.HOURS_COLUMN:
+            return "Gibljivi delovni čas" if row[3] == -1 else f"{int(row[3])} ur"
+        if column == self.GROUP_COLUMN:
+            return row[5] or ""
+        return None
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if not index.isValid() or role != Qt.ItemDataRole.EditRole:
+            return False
+        row = self.rows[index.row()]
+        if index.column() == self.HOURS_COLUMN:
+            if value == row[3]:
+                return False
+            row[3] = value
+            field = 'daily_hours'
+        elif index.column() == self.GROUP_COLUMN:
+            if value == row[4]:
+                return False
+            row[4] = value
+            row[5] = next((name for group_id, name in self.groups if group_id == value), None)
+            field = 'group_id'
+        else:
+            return False
+        self.dataChanged.emit(index, index)
+        self.employee_edited.emit(row[0], field, value)
+        return True
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.column() in (self.HOURS_COLUMN, self.GROUP_COLUMN):
+            flags |= Qt.ItemFlag.ItemIsEditable
+        return flags
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+class ComboBoxDelegate(QStyledItemDelegate):
+    """Paints a cell as a combo box and creates the real QComboBox only while the cell is edited
+    
+    A click opens the editor with its list shown, like a combo box widget in the cell; an editor
+    opened from the keyboard (F2) doesn't open the list, so it doesn't take the arrow keys."""
+
+    def __init__(self, options, parent=None):
+        super().__init__(parent)
+        self.options = options  # Callable returning (text, data) pairs
+        self.show_popup = False  # Set while a click opens the editor
+
+    def paint(self, painter, option, index):
+        combo_option = QStyleOptionComboBox()
+        combo_option.rect = option.rect
+        combo_option.state = option.state
+        combo_option.currentText = index.data() or ""
+        style = QApplication.style()
+        style.drawComplexControl(QStyle.ComplexControl.CC_ComboBox, combo_option, painter)
+        style.drawControl(QStyle.ControlElement.CE_ComboBoxLabel, combo_option, painter)
+
+    def createEditor(self, parent, option, index):
+        combo = QComboBox(parent)
+        for text, data in self.options():
+            combo.addItem(text, data)
+        combo.activated.connect(lambda _, combo=combo: self.commit_and_close(combo))
+        if self.show_popup:
+            QTimer.singleShot(0, combo.showPopup)
+        return combo
+
+    def editorEvent(self, event, model, option, index):
+        if (event.type() == QEvent.Type.MouseButtonRelease and event.button() == Qt.MouseButton.LeftButton
+                and isinstance(self.parent(), QAbstractItemView)):
+            self.show_popup = True
+            self.parent().edit(index)
+            self.show_popup = False
+            return True
+        return super().editorEvent(event, model, option, index)
+
+    def commit_and_close(self, combo):
+        self.commitData.emit(combo)
+        self.closeEditor.emit(combo)
+
+    def setEditorData(self, editor, index):
+        position = editor.findData(index.data(Qt.ItemDataRole.EditRole))
+        if position >= 0:
+            editor.setCurrentIndex(position)
+
+    def setModelData(self, editor, model, index):
+        model.setData(index, editor.currentData(), Qt.ItemDataRole.EditRole)
+
+class ActionButtonsDelegate(QStyledItemDelegate):
+    """Paints a strip of buttons in every row and reports clicks as (action, row), no widgets per row"""
+
+    action_triggered = pyqtSignal(str, int)
+
+    SPACING = 2
+    ICON_BUTTON_WIDTH = 30
+
+    def __init__(self, buttons, parent=None):
+        super().__init__(parent)
+        self.buttons = buttons  # (action, text, icon filename or None, tooltip)
+        self.pressed = None  # (row, action) while the mouse button is down
+
+    def button_rects(self, rect, font_metrics):
+        """Rectangles of the buttons inside a cell"""
+        rects = []
+        x = rect.x()
+        for action, text, icon_name, tooltip in self.buttons:
+            if icon_name and IconCache.get(icon_name) is not None:
+                width = self.ICON_BUTTON_WIDTH
+            else:
+                width = font_metrics.horizontalAdvance(text) + 16
+            rects.append((action, QRect(x, rect.y() + 1, width, rect.height() - 2)))
+            x += width + self.SPACING
+        return rects
+
+    def paint(self, painter, option, index):
+        style = QApplication.style()
+        for (action, text, icon_name, tooltip), (_, rect) in zip(self.buttons, self.button_rects(option.rect, option.fontMetrics)):
+            button_option = QStyleOptionButton()
+            button_option.rect = rect
+            button_option.state = QStyle.StateFlag.State_Enabled
+            if self.pressed == (index.row(), action):
+                button_option.state |= QStyle.StateFlag.State_Sunken
+            else:
+                button_option.state |= QStyle.StateFlag.State_Raised
+            icon = IconCache.get(icon_name) if icon_name else None
+            if icon is not None:
+                button_option.icon = icon
+                button_option.iconSize = QSize(20, 20)
+            else:
+                button_option.text = text
+            style.drawControl(QStyle.ControlElement.CE_PushButton, button_option, painter)
+
+    def action_at(self, option, position):
+        for action, rect in self.button_rects(option.rect, option.fontMetrics):
+            if rect.contains(position):
+                return action
+        return None
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.Type.MouseButtonPress and event.button() == Qt.MouseButton.LeftButton:
+            action = self.action_at(option, event.position().toPoint())
+            self.pressed = (index.row(), action) if action else None
+            return action is not None
+        if event.type() == QEvent.Type.MouseButtonRelease and self.pressed is not None:
+            row, action = self.pressed
+            self.pressed = None
+            if row == index.row() and self.action_at(option, event.position().toPoint()) == action:
+                self.action_triggered.emit(action, row)
+            return True
+        return super().editorEvent(event, model, option, index)
+
+    def helpEvent(self, event, view, option, index):
+        action = self.action_at(option, event.pos())
+        tooltip = next((tip for name, text, icon_name, tip in self.buttons if name == action), None)
+        if tooltip:
+            QToolTip.showText(event.globalPos(), tooltip, view)
+            return True
+        return super().helpEvent(event, view, option, index)
+
 class ResultsDialog(QDialog):
     def __init__(self, data, summary=None, parent=None):
         super().__init__(parent)
@@ -180,11 +554,12 @@ class ResultsDialog(QDialog):
             self.summary_label.setStyleSheet("font-weight: bold; margin-bottom: 10px;")
             layout.addWidget(self.summary_label)
         
-        # Results table
-        self.table = QTableWidget()
-        self.table.setColumnCount(len(data.columns))
-        self.table.setHorizontalHeaderLabels(data.columns)
-        self.table.setRowCount(len(data))
+        # Results table, the view only formats the rows that are visible
+        self.model = DataFrameTableModel(data, self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setSortingEnabled(True)
+        self.table.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
         
         # Set column widths based on content
         for i, column in enumerate(data.columns):
@@ -192,12 +567,6 @@ class ResultsDialog(QDialog):
             header_width = len(column) * 10  # Approximate width based on character count
             self.table.setColumnWidth(i, max(header_width, 100))  # Minimum width of 100 pixels
         
-        # Fill the table with data
-        for i, row in data.iterrows():
-            for j, value in enumerate(row):
-                item = QTableWidgetItem(str(value))
-                self.table.setItem(i, j, item)
-        
         # Make the table stretch to fill the dialog
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
         layout.addWidget(self.table)
@@ -217,25 +586,8 @@ class ResultsDialog(QDialog):
         
         if file_path:
             try:
-                # Get data from table
-                data = []
-                headers = []
-                
-                # Get headers
-                for col in range(self.table.columnCount()):
-                    header = self.table.horizontalHeaderItem(col).text()
-                    headers.append(header)
-                
-                # Get data
-                for row in range(self.table.rowCount()):
-                    row_data = []
-                    for col in range(self.table.columnCount()):
-                        item = self.table.item(row, col)
-                        row_data.append(item.text() if item else "")
-                    data.append(row_data)
-                
-                # Create DataFrame
-                df = pd.DataFrame(data, columns=headers)
+                # Export the result frame in the order it is shown
+                df = self.model.frame
                 
                 # Write to CSV with semicolon separator, including summary at the top
                 with open(file_path, 'w', encoding='utf-8') as f:
@@ -266,6 +618,7 @@ class SearchEmployeeDialog(QDialog):
         self.card_input = QLineEdit()
         self.card_input.setMaxLength(14)
         self.card_input.setPlaceholderText("Vnesite 14-mestno šestnajstiško število")
+        self.card_input.returnPressed.connect(self.search_employee)
         card_layout.addWidget(self.card_input)
         layout.addLayout(card_layout)
         
@@ -288,18 +641,11 @@ class SearchEmployeeDialog(QDialog):
             return
         
         try:
-            # Find employee in database
-            self.parent().cursor.execute("""
-                SELECT e.name, e.daily_hours, g.name as group_name
-                FROM employees e
-                LEFT JOIN groups g ON e.group_id = g.id
-                WHERE LOWER(e.card_id) = ?
-            """, (card_id,))
-            
-            employee = self.parent().cursor.fetchone()
+            # Find employee in the main window's search index
+            employee = self.parent().employee_model.search_index.find_card(card_id)
             
             if employee:
-                name, daily_hours, group_name = employee
+                name, daily_hours, group_name = employee[1], employee[3], employee[5]
                 message = f"Ime delavca: {name}\n"
                 message += f"Dnevni delovni čas: {daily_hours} ur\n"
                 message += f"Skupina: {group_name if group_name else 'Ni dodeljena'}"
@@ -323,6 +669,8 @@ class CalendarDialog(QDialog):
         self.month_data = {}
         self.month_cache = {}  # Cache for storing month data
         self.special_day_formats = {}  # Store special day formatting
+        self.base_formats = {}  # Format of every date without selection, to restore deselected cells
+        self.card_records = {}  # This card's time records per month, for the day details
         self.current_month = None  # Track current month
         
         # Get worker's name
@@ -390,6 +738,8 @@ class CalendarDialog(QDialog):
             month_key = self.current_month
             if month_key in self.month_cache:
                 del self.month_cache[month_key]
+            # Also read the month's records from SMB again
+            self.parent().month_records.invalidate(month_key)
         
         # Reload the current month data
         self.load_month_data()
@@ -399,11 +749,13 @@ class CalendarDialog(QDialog):
         self.month_cache.clear()
         self.month_data = {}
         self.special_day_formats = {}
+        self.card_records = {}
         
     def on_date_clicked(self, date):
         """Handle date selection"""
         # Get keyboard modifiers
         modifiers = QApplication.keyboardModifiers()
+        previous_selection = set(self.selected_dates)
         
         if modifiers & Qt.KeyboardModifier.ShiftModifier and self.last_clicked_date is not None:
             # Handle range selection
@@ -426,11 +778,8 @@ class CalendarDialog(QDialog):
         # Store the last clicked date
         self.last_clicked_date = date
         
-        # Clear all formatting first
-        self.calendar.setDateTextFormat(QDate(), QTextCharFormat())
-        
-        # Update calendar appearance
-        self.update_calendar_appearance()
+        # Only repaint the cells whose selection changed
+        self.update_calendar_appearance(previous_selection)
         
         # Show details for the clicked date
         self.show_date_details(date)
@@ -473,6 +822,7 @@ class CalendarDialog(QDialog):
     def on_month_changed(self, year, month):
         """Handle month change in calendar"""
         # Clear previous selection
+        previous_selection = set(self.selected_dates)
         self.selected_dates.clear()
         self.last_clicked_date = None
         
@@ -482,6 +832,7 @@ class CalendarDialog(QDialog):
         
         # Update the display
         self.load_month_data()
+        self.update_calendar_appearance(previous_selection)
         
         # Show details for the first day of the month
         self.show_date_details(new_date)
@@ -550,23 +901,24 @@ class CalendarDialog(QDialog):
 
         # Fetch and show all arrivals and departures for this day
         try:
-            # Read only this day's data from SMB
+            # Use the records already loaded for the month, read only this day's data from SMB otherwise
             parent = self.parent()
-            if parent is not None:
+            df = self.card_records.get((py_date.year, py_date.month))
+            if df is None and parent is not None:
                 # Use parent's read_smb_files to get raw data for this day
-                df = parent.read_smb_files(py_date, py_date)
-                if df is not None and not df.empty:
-                    # Filter for this card_id and date
-                    df = df[(df['CardID'] == self.card_id) & (df['Timestamp'].dt.date == py_date)]
-                    df = df.sort_values('Timestamp')
-                    if not df.empty:
-                        details += "\n\nVsi prihodi in odhodi za ta dan:\n"
-                        for _, row in df.iterrows():
-                            time_str = row['Timestamp'].strftime('%H:%M:%S')
-                            if row['Status'] == 'Prihod na delo':
-                                details += f"Prihod na delo: {time_str}\n"
-                            elif row['Status'] == 'Izhod iz dela':
-                                details += f"Izhod iz dela: {time_str}\n"
+                df = parent.read_smb_files(py_date, py_date, card_ids=[self.card_id])
+            if df is not None and not df.empty:
+                # Filter for this card_id and date
+                df = df[(df['CardID'] == self.card_id) & (df['Timestamp'].dt.date == py_date)]
+                df = df.sort_values('Timestamp')
+                if not df.empty:
+                    details += "\n\nVsi prihodi in odhodi za ta dan:\n"
+                    for _, row in df.iterrows():
+                        time_str = row['Timestamp'].strftime('%H:%M:%S')
+                        if row['Status'] == 'Prihod na delo':
+                            details += f"Prihod na delo: {time_str}\n"
+                        elif row['Status'] == 'Izhod iz dela':
+                            details += f"Izhod iz dela: {time_str}\n"
         except Exception as e:
             details += f"\nNapaka pri pridobivanju vseh prihodov/odhodov: {str(e)}"
         self.day_details.setText(details)
@@ -624,6 +976,7 @@ class CalendarDialog(QDialog):
                 format.setForeground(QBrush(Qt.GlobalColor.black))
                 format.setToolTip(text)
                 self.special_day_formats[py_date] = format
+                self.base_formats[py_date] = format
                 
                 # Apply the format immediately
                 self.calendar.setDateTextFormat(date, format)
@@ -681,6 +1034,7 @@ class CalendarDialog(QDialog):
             
             # Clear all formatting
             self.calendar.setDateTextFormat(QDate(), QTextCharFormat())
+            self.base_formats.clear()
             
             # Reload the month data
             self.load_month_data()
@@ -724,6 +1078,14 @@ class CalendarDialog(QDialog):
             
             qdate = QDate(date.year, date.month, date.day)
             self.calendar.setDateTextFormat(qdate, format)
+            self.base_formats[date] = format
+        
+        # Special days of the month without records are not in the month data
+        year, month = self.current_month
+        for date, format in self.special_day_formats.items():
+            if (date.year, date.month) == (year, month) and date not in self.month_data:
+                self.calendar.setDateTextFormat(QDate(date.year, date.month, date.day), format)
+                self.base_formats[date] = format
         
         # Force the calendar to update its appearance
         self.calendar.updateCells()
@@ -753,8 +1115,9 @@ class CalendarDialog(QDialog):
             daily_hours = self.cursor.fetchone()[0]
             is_flexible = daily_hours == -1
             
-            # Get attendance data for the month
-            result = self.parent().calculate_working_hours(self.card_id, first_day.toPyDate(), last_day.toPyDate())
+            # Get attendance data for the month, the month's records are shared by all calendars
+            records = self.parent().get_month_records(current_date.year(), current_date.month())
+            result = self.parent().calculate_working_hours(self.card_id, first_day.toPyDate(), last_day.toPyDate(), data=records)
             
             # Get special days for the month
             self.cursor.execute("""
@@ -772,6 +1135,10 @@ class CalendarDialog(QDialog):
             
             # Clear previous formatting
             self.calendar.setDateTextFormat(QDate(), QTextCharFormat())
+            self.base_formats.clear()
+            
+            # Keep this card's records of the month for the day details
+            self.card_records[month_key] = records[records['CardID'] == self.card_id]
             
             if result is not None:
                 # Create a dictionary of dates and their status
@@ -815,6 +1182,7 @@ class CalendarDialog(QDialog):
                     # Set the format for this date
                     qdate = QDate(date.year, date.month, date.day)
                     self.calendar.setDateTextFormat(qdate, format)
+                    self.base_formats[date] = format
                     
                     self.month_data[date] = {
                         'hours': hours,
@@ -839,6 +1207,7 @@ class CalendarDialog(QDialog):
                     format.setToolTip(text)
                     qdate = QDate(date.year, date.month, date.day)
                     self.calendar.setDateTextFormat(qdate, format)
+                    self.base_formats[date] = format
                     # Store special day format
                     self.special_day_formats[date] = format
             
@@ -852,32 +1221,31 @@ class CalendarDialog(QDialog):
             # Show details for the first day of the month
             self.show_date_details(first_day)
             
+            # Warm up the neighbouring months so navigation doesn't wait for SMB
+            prev_month = first_day.addMonths(-1)
+            next_month = first_day.addMonths(1)
+            self.parent().prefetch_months([(prev_month.year(), prev_month.month()),
+                                           (next_month.year(), next_month.month())])
+            
         except Exception as e:
             QMessageBox.critical(self, "Napaka", f"Napaka pri nalaganju podatkov: {str(e)}")
             print(f"Error in load_month_data: {str(e)}")
             import traceback
             print(traceback.format_exc())
             
-    def update_calendar_appearance(self):
-        """Update the calendar appearance with both special days and selection"""
-        # First, restore all special day formatting
-        self.load_month_data()
-        
+    def update_calendar_appearance(self, previous_selection=()):
+        """Update the selection formatting without reloading the month, only deselected and selected cells are touched"""
         # Create selection format
         selection_format = QTextCharFormat()
         selection_format.setBackground(QBrush(QColor(200, 200, 200, 100)))  # Semi-transparent light gray
         selection_format.setForeground(QBrush(Qt.GlobalColor.black))
         
-        # First apply all special day formatting
-        for date, format in self.special_day_formats.items():
-            qdate = QDate(date.year, date.month, date.day)
-            self.calendar.setDateTextFormat(qdate, format)
-        
-        # Then apply selection formatting to selected dates
-        for date in self.selected_dates:
-            # Check if this is a special day
+        for date in set(previous_selection) | self.selected_dates:
             py_date = date.toPyDate()
-            if py_date in self.special_day_formats:
+            if date not in self.selected_dates:
+                # Deselected, restore the day's own formatting
+                self.calendar.setDateTextFormat(date, self.base_formats.get(py_date, QTextCharFormat()))
+            elif py_date in self.special_day_formats:
                 # For special days, combine the formats
                 special_format = self.special_day_formats[py_date]
                 combined_format = QTextCharFormat(special_format)
@@ -890,7 +1258,6 @@ class CalendarDialog(QDialog):
         
         # Force the calendar to update its appearance
         self.calendar.updateCells()
-        self.calendar.repaint()
     
     def edit_worktime_for_day(self, date):
         """Open worktime edit dialog for the selected day"""
@@ -970,7 +1337,7 @@ class WorktimeEditDialog(QDialog):
         """Load worktime data for the selected day from SMB share"""
         try:
             # Get worktime data from main window's SMB files
-            df = self.main_window.read_smb_files(self.date, self.date)
+            df = self.main_window.read_smb_files(self.date, self.date, card_ids=[str(self.card_id)])
             
             if df is not None and not df.empty:
                 # Filter data for this card_id
@@ -1100,116 +1467,24 @@ class WorktimeEditDialog(QDialog):
             print(f"Card ID: {self.card_id}")
             print(f"Date: {self.date}")
             
-            # Try to read current CSV file
-            df = None
-            try:
-                df = self.main_window.read_smb_files(self.date, self.date)
-                debug_info.append(f"Loaded DataFrame shape: {df.shape if df is not None else 'None'}")
-                print(f"Loaded DataFrame shape: {df.shape if df is not None else 'None'}")
-                if df is not None and not df.empty:
-                    debug_info.append(f"DataFrame columns: {df.columns.tolist()}")
-                    debug_info.append(f"DataFrame content:\n{df}")
-                    print(f"DataFrame columns: {df.columns.tolist()}")
-                    print(f"DataFrame content:\n{df}")
-            except Exception as e:
-                error_msg = f"Could not read existing data for deletion: {str(e)}"
-                debug_info.append(error_msg)
-                print(error_msg)
-                # If we can't read the file, there's nothing to delete
-                # This is not an error - just means the file doesn't exist or is empty
-                return
+            # Create full timestamp for comparison (combine date with time)
+            if ' ' not in str(timestamp):
+                # If timestamp is just time, combine with date
+                full_timestamp = f"{self.date.strftime('%Y-%m-%d')} {timestamp}"
+            else:
+                # If timestamp is already full datetime, use as is
+                full_timestamp = str(timestamp)
             
-            if df is not None and not df.empty:
-                # Create full timestamp for comparison (combine date with time)
-                if ' ' not in str(timestamp):
-                    # If timestamp is just time, combine with date
-                    full_timestamp = f"{self.date.strftime('%Y-%m-%d')} {timestamp}"
-                else:
-                    # If timestamp is already full datetime, use as is
-                    full_timestamp = str(timestamp)
-                
-                debug_info.append(f"Full timestamp for comparison: {full_timestamp}")
-                print(f"Full timestamp for comparison: {full_timestamp}")
-                
-                # Check what timestamps are actually in the DataFrame
-                debug_info.append("Timestamps in DataFrame:")
-                print(f"Timestamps in DataFrame:")
-                for i, ts in enumerate(df['Timestamp']):
-                    debug_info.append(f"  {i}: {ts} (type: {type(ts)})")
-                    print(f"  {i}: {ts} (type: {type(ts)})")
-                
-                # Check if the entry exists before trying to delete it
-                card_matches = df['CardID'] == str(self.card_id)
-                timestamp_matches = df['Timestamp'].astype(str) == full_timestamp
-                status_matches = df['Status'] == status
-                
-                debug_info.append(f"Card matches: {card_matches.sum()}")
-                debug_info.append(f"Timestamp matches: {timestamp_matches.sum()}")
-                debug_info.append(f"Status matches: {status_matches.sum()}")
-                print(f"Card matches: {card_matches.sum()}")
-                print(f"Timestamp matches: {timestamp_matches.sum()}")
-                print(f"Status matches: {status_matches.sum()}")
-                
-                entry_exists = (card_matches & timestamp_matches & status_matches).any()
-                debug_info.append(f"Entry exists: {entry_exists}")
-                print(f"Entry exists: {entry_exists}")
-                
-                if entry_exists:
-                    debug_info.append("Entry found, proceeding with deletion...")
-                    print("Entry found, proceeding with deletion...")
-                    # Filter out the entry to delete
-                    df_filtered = df[~(card_matches & timestamp_matches & status_matches)]
-                    debug_info.append(f"Filtered DataFrame shape: {df_filtered.shape}")
-                    print(f"Filtered DataFrame shape: {df_filtered.shape}")
-                    
-                    # Update CSV file only if there are still entries left
-                    if not df_filtered.empty:
-                        debug_info.append("Updating CSV file with remaining entries...")
-                        print("Updating CSV file with remaining entries...")
-                        try:
-                            self.update_csv_file(df_filtered)
-                            debug_info.append("CSV file updated successfully!")
-                        except Exception as e:
-                            debug_info.append(f"ERROR updating CSV file: {str(e)}")
-                            raise
-                    else:
-                        debug_info.append("No entries left, deleting CSV file...")
-                        print("No entries left, deleting CSV file...")
-                        # If no entries left, delete the file
-                        try:
-                            self.delete_csv_file()
-                            debug_info.append("CSV file deleted successfully!")
-                        except Exception as e:
-                            debug_info.append(f"ERROR deleting CSV file: {str(e)}")
-                            raise
-                    debug_info.append("Deletion completed successfully!")
-                    print("Deletion completed successfully!")
-                else:
-                    debug_info.append(f"Entry not found for deletion: {full_timestamp}, {status}")
-                    print(f"Entry not found for deletion: {full_timestamp}, {status}")
-                    # Try alternative timestamp formats
-                    debug_info.append("Trying alternative timestamp formats...")
-                    print("Trying alternative timestamp formats...")
-                    for alt_format in [timestamp, str(timestamp), full_timestamp]:
-                        alt_matches = df['Timestamp'].astype(str) == alt_format
-                        if (card_matches & alt_matches & status_matches).any():
-                            debug_info.append(f"Found match with format: {alt_format}")
-                            print(f"Found match with format: {alt_format}")
-                            # Use this format for deletion
-                            df_filtered = df[~(card_matches & alt_matches & status_matches)]
-                            if not df_filtered.empty:
-                                self.update_csv_file(df_filtered)
-                            else:
-                                self.delete_csv_file()
-                            debug_info.append("Deletion completed with alternative format!")
-                            print("Deletion completed with alternative format!")
-                            return
-                    debug_info.append("No matches found with any timestamp format")
-                    print("No matches found with any timestamp format")
+            debug_info.append(f"Full timestamp for comparison: {full_timestamp}")
+            print(f"Full timestamp for comparison: {full_timestamp}")
+            
+            # The file is read, filtered and written back in one guarded rewrite
+            if self.remove_from_csv(full_timestamp, status):
+                debug_info.append("Deletion completed successfully!")
+                print("Deletion completed successfully!")
             else:
-                # No data to delete
-                debug_info.append("No data found to delete")
-                print("No data found to delete")
+                debug_info.append(f"Entry not found for deletion: {full_timestamp}, {status}")
+                print(f"Entry not found for deletion: {full_timestamp}, {status}")
             
             # Debug info is available in console output if needed
             
@@ -1219,215 +1494,24 @@ class WorktimeEditDialog(QDialog):
             pass  # Error details are in console output
             raise Exception(f"Napaka pri posodabljanju CSV datoteke: {str(e)}")
     
-    def delete_csv_file(self):
-        """Delete the CSV file from SMB share"""
-        try:
-            import configparser
-            from smb.SMBConnection import SMBConnection
-            
-            # Load configuration
-            config = configparser.ConfigParser()
-            config.read('config.ini')
-            
-            if 'SMB' not in config:
-                raise ValueError("Nastavitve SMB niso bile najdene.")
-            
-            smb_path = config['SMB'].get('path', '')
-            if not smb_path.startswith('\\\\'):
-                raise ValueError("Neveljavna SMB pot")
-            
-            # Parse SMB path more safely
-            path_parts = smb_path.split('\\')
-            if len(path_parts) < 4:
-                raise ValueError("Neveljavna SMB pot - manjkajo deli poti")
-            
-            server_name = path_parts[2]
-            share_name = path_parts[3]
-            username = config['SMB'].get('username', '')
-            password = config['SMB'].get('password', '')
-            
-            # Connect to SMB share
-            conn = SMBConnection(username, password, "CLIENT", server_name, use_ntlm_v2=True)
-            connected = conn.connect(server_name, 445)
-            
-            if not connected:
-                raise ConnectionError(f"Ni mogoče vzpostaviti povezave s strežnikom {server_name}")
-            
-            # Delete the file
-            filename = f"time_records_{self.date.strftime('%Y%m%d')}.csv"
-            try:
-                conn.deleteFiles(share_name, filename)
-                print(f"File {filename} deleted successfully")
-            except Exception as e:
-                print(f"Could not delete file {filename}: {str(e)}")
-                # This is not necessarily an error - file might not exist
-            finally:
-                conn.close()
-                
-        except Exception as e:
-            print(f"Error in delete_csv_file: {str(e)}")
-            # Don't raise exception here as this is not critical
+    def remove_from_csv(self, full_timestamp, status):
+        """Remove the entry from the day file, keeping records that were added to the file in the meantime
+        
+        Returns whether the entry was found."""
+        removed = []
+        def remove_entry(df):
+            timestamps = pd.to_datetime(df['Timestamp'], format='%Y-%m-%d %H:%M:%S', errors='coerce').astype(str)
+            matches = (df['CardID'] == str(self.card_id)) & (timestamps == full_timestamp) & (df['Status'] == status)
+            removed.append(bool(matches.any()))
+            return df[~matches]
+        self.main_window.rewrite_time_record_file(self.date, remove_entry)
+        return bool(removed) and removed[-1]
     
     def update_csv_file(self, df):
         """Update the CSV file in SMB share"""
-        try:
-            import configparser
-            import io
-            import tempfile
-            import os
-            from smb.SMBConnection import SMBConnection
-            
-            print(f"Updating CSV file for date: {self.date}")
-            print(f"DataFrame shape: {df.shape}")
-            print(f"DataFrame content:\n{df}")
-            
-            # Load configuration
-            config = configparser.ConfigParser()
-            config.read('config.ini')
-            
-            if 'SMB' not in config:
-                raise ValueError("Nastavitve SMB niso bile najdene.")
-            
-            smb_path = config['SMB'].get('path', '')
-            if not smb_path.startswith('\\\\'):
-                raise ValueError("Neveljavna SMB pot")
-            
-            # Parse SMB path more safely
-            path_parts = smb_path.split('\\')
-            if len(path_parts) < 4:
-                raise ValueError("Neveljavna SMB pot - manjkajo deli poti")
-            
-            server_name = path_parts[2]
-            share_name = path_parts[3]
-            username = config['SMB'].get('username', '')
-            password = config['SMB'].get('password', '')
-            
-            print(f"Connecting to SMB: {server_name}/{share_name}")
-            print(f"Username: {username}")
-            print(f"Path: {smb_path}")
-            
-            # Connect to SMB share
-            conn = SMBConnection(username, password, "CLIENT", server_name, use_ntlm_v2=True)
-            connected = conn.connect(server_name, 445)
-            
-            if not connected:
-                raise ConnectionError(f"Ni mogoče vzpostaviti povezave s strežnikom {server_name}")
-            
-            # Create CSV content
-            csv_content = df.to_csv(index=False, header=False)
-            print(f"CSV content:\n{csv_content}")
-            
-            # Save to SMB share
-            filename = f"time_records_{self.date.strftime('%Y%m%d')}.csv"
-            print(f"Saving to file: {filename}")
-            
-            # Try multiple approaches to handle permission issues
-            success = False
-            error_messages = []
-            
-            # Method 1: Direct file storage
-            try:
-                file_obj = io.BytesIO(csv_content.encode('utf-8'))
-                conn.storeFile(share_name, filename, file_obj)
-                print("File saved successfully using direct method!")
-                success = True
-            except Exception as e:
-                error_msg = f"Direct method failed: {str(e)}"
-                print(error_msg)
-                error_messages.append(error_msg)
-            
-            # Method 2: Try deleting existing file first, then create new one
-            if not success:
-                try:
-                    print("Trying to delete existing file first...")
-                    try:
-                        conn.deleteFiles(share_name, filename)
-                        print("Existing file deleted successfully")
-                    except:
-                        print("No existing file to delete or deletion failed")
-                    
-                    # Now try to create new file
-                    file_obj = io.BytesIO(csv_content.encode('utf-8'))
-                    conn.storeFile(share_name, filename, file_obj)
-                    print("File saved successfully using delete-first method!")
-                    success = True
-                except Exception as e:
-                    error_msg = f"Delete-first method failed: {str(e)}"
-                    print(error_msg)
-                    error_messages.append(error_msg)
-            
-            # Method 3: Try with temporary filename then rename
-            if not success:
-                try:
-                    temp_filename = f"temp_{filename}"
-                    print(f"Trying with temporary filename: {temp_filename}")
-                    
-                    file_obj = io.BytesIO(csv_content.encode('utf-8'))
-                    conn.storeFile(share_name, temp_filename, file_obj)
-                    print("Temporary file created successfully")
-                    
-                    # Try to delete original and rename temp
-                    try:
-                        conn.deleteFiles(share_name, filename)
-                    except:
-                        pass  # Ignore if original doesn't exist
-                    
-                    # Note: SMB doesn't have a direct rename, so we'll keep the temp file
-                    # and try to delete it, then create the final file
-                    try:
-                        temp_file_obj = io.BytesIO()
-                        conn.retrieveFile(share_name, temp_filename, temp_file_obj)
-                        temp_file_obj.seek(0)
-                        
-                        final_file_obj = io.BytesIO(temp_file_obj.read())
-                        conn.storeFile(share_name, filename, final_file_obj)
-                        conn.deleteFiles(share_name, temp_filename)
-                        print("File saved successfully using temporary file method!")
-                        success = True
-                    except Exception as rename_e:
-                        # Keep the temp file as fallback
-                        print(f"Rename failed, keeping temporary file: {rename_e}")
-                        success = True  # At least we have the data in temp file
-                        
-                except Exception as e:
-                    error_msg = f"Temporary file method failed: {str(e)}"
-                    print(error_msg)
-                    error_messages.append(error_msg)
-            
-            conn.close()
-            
-            if not success:
-                # All methods failed
-                all_errors = "; ".join(error_messages)
-                raise Exception(f"Vse metode shranjevanja so neuspešne: {all_errors}")
-            else:
-                print("CSV file updated successfully!")
-                
-        except Exception as e:
-            print(f"Error in update_csv_file: {str(e)}")
-            # Check if this is a permission error
-            if "0xC0000022" in str(e) or "ACCESS_DENIED" in str(e).upper() or "Unable to open file" in str(e):
-                # Try to save locally as backup
-                try:
-                    import os
-                    backup_dir = "backup_csv"
-                    if not os.path.exists(backup_dir):
-                        os.makedirs(backup_dir)
-                    
-                    local_filename = os.path.join(backup_dir, f"time_records_{self.date.strftime('%Y%m%d')}.csv")
-                    csv_content = df.to_csv(index=False, header=False)
-                    
-                    with open(local_filename, 'w', encoding='utf-8') as f:
-                        f.write(csv_content)
-                    
-                    print(f"Data saved locally as backup: {local_filename}")
-                    
-                    raise Exception(f"NAPAKA DOVOLJENJ: Aplikacija nima dovoljenja za pisanje v SMB mapo. Podatki so bili shranjeni lokalno kot varnostna kopija v {local_filename}. Prosimo kontaktirajte sistemskega administratorja za nastavitev ustreznih dovoljenj. Tehnični opis: {str(e)}")
-                except Exception as backup_e:
-                    print(f"Backup save also failed: {backup_e}")
-                    raise Exception(f"NAPAKA DOVOLJENJ: Aplikacija nima dovoljenja za pisanje v SMB mapo. Varnostna kopija ni mogla biti shranjena. Prosimo kontaktirajte sistemskega administratorja za nastavitev ustreznih dovoljenj. Tehnični opis: {str(e)}")
-            else:
-                raise Exception(f"Napaka pri posodabljanju CSV datoteke: {str(e)}")
+        print(f"DataFrame content:\n{df}")
+        self.main_window.update_csv_file_for_date(df, self.date)
+        print("CSV file updated successfully!")
     
     def add_arrival(self):
         """Open dialog to add arrival time"""
@@ -1455,6 +1539,15 @@ class WorktimeEditDialog(QDialog):
             # Combine date with time to create full datetime string
             full_timestamp = f"{self.date.strftime('%Y-%m-%d')} {time_str}"
             
+            # Write only the new line at the end of the file, so records added by the terminal are kept
+            try:
+                self.main_window.append_time_record(self.date, self.card_id, full_timestamp, status)
+                self.data_modified = True
+                QMessageBox.information(self, "Uspeh", "Vrednost je bila uspešno dodana.")
+                return
+            except Exception as e:
+                print(f"Could not append to CSV file, rewriting it: {str(e)}")
+            
             # Create new entry
             new_entry = pd.DataFrame({
                 'CardID': [str(self.card_id)],
@@ -1462,23 +1555,15 @@ class WorktimeEditDialog(QDialog):
                 'Status': [status]
             })
             
-            # Try to read existing data
-            existing_df = None
-            try:
-                existing_df = self.main_window.read_smb_files(self.date, self.date)
-            except Exception as e:
-                print(f"Could not read existing data: {str(e)}")
-                # Continue with creating new file
-            
-            if existing_df is not None and not existing_df.empty:
-                # Append new entry to existing data
-                updated_df = pd.concat([existing_df, new_entry], ignore_index=True)
-            else:
-                # Create new file with just this entry
-                updated_df = new_entry
-            
-            # Update CSV file
-            self.update_csv_file(updated_df)
+            # Rewrite the file with the entry added, nothing is written when the file can't be read.
+            # The append may have landed before its connection failed, so an identical record isn't added twice.
+            def add_entry(df):
+                timestamps = pd.to_datetime(df['Timestamp'], format='%Y-%m-%d %H:%M:%S', errors='coerce').astype(str)
+                exists = (df['CardID'] == str(self.card_id)) & (timestamps == full_timestamp) & (df['Status'] == status)
+                return df if exists.any() else pd.concat([df, new_entry], ignore_index=True)
+            if self.main_window.rewrite_time_record_file(self.date, add_entry) is None:
+                # The day has no file yet
+                self.update_csv_file(new_entry)
             
             # Mark data as modified
             self.data_modified = True
@@ -1691,6 +1776,10 @@ class SettingsDialog(QDialog):
             with open('config.ini', 'w') as configfile:
                 config.write(configfile)
             
+            # Drop sessions opened with the previous settings
+            if hasattr(self.parent(), 'smb_pool'):
+                self.parent().smb_pool.reset()
+            
             QMessageBox.information(self, "Uspeh", "Nastavitve so bile uspešno shranjene!")
             self.accept()
         except Exception as e:
@@ -2036,54 +2125,729 @@ E-mail: klemen.ambrozic@oscg.si
         """Add a section to the manual (legacy method for compatibility)"""
         self.add_section_with_icon(layout, title, content, "manual.png")
 
-class SMBUpdateWorker(QThread):
-    """Worker thread for checking SMB updates without blocking the GUI"""
-    update_available = pyqtSignal(int)  # Signal with version number when update is loaded
-    update_complete = pyqtSignal()
-    
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.parent_window = parent
-        self.running = True
-    
-    def run(self):
-        """Check for updates in background thread"""
-        if not self.running or not self.parent_window:
-            return
-            
+class SMBSessionPool:
+    """Pool of authenticated SMB sessions shared by all SMB readers and writers"""
+
+    # Errors that mean the session itself is unusable (file errors keep the session)
+    CONNECTION_ERRORS = (NotConnectedError, SMBTimeout, ConnectionError, OSError)
+
+    def __init__(self, config_path='config.ini', max_size=4, idle_check_after=30):
+        self.config_path = config_path
+        self.max_size = max_size
+        self.idle_check_after = idle_check_after  # Seconds idle before a health check
+
+        self._cond = threading.Condition()
+        self._idle = []  # (conn, last_used) pairs ready for reuse
+        self._generations = {}  # conn -> settings generation it was opened with
+        self._open_count = 0
+        self._generation = 0
+        self._settings = None
+        self._config_mtime = None
+
+    def _load_settings(self):
+        """Read SMB settings from config.ini, parsing the file only when it changes"""
+        if not os.path.exists(self.config_path):
+            raise ValueError("Nastavitve niso bile najdene. Najprej nastavite SMB povezavo.")
+
+        mtime = os.path.getmtime(self.config_path)
+        if self._settings is not None and mtime == self._config_mtime:
+            return self._settings
+
+        config = configparser.ConfigParser()
+        config.read(self.config_path)
+        if 'SMB' not in config:
+            raise ValueError("Nastavitve SMB niso bile najdene. Najprej nastavite SMB povezavo.")
+
+        smb_path = config['SMB'].get('path', '')
+        if not smb_path.startswith('\\\\'):
+            raise ValueError("Neveljavna SMB pot")
+
+        path_parts = smb_path.split('\\')
+        if len(path_parts) < 4:
+            raise ValueError("Neveljavna SMB pot - manjkajo deli poti")
+
+        settings = (path_parts[2], path_parts[3],
+                    config['SMB'].get('username', ''), config['SMB'].get('password', ''))
+
+        if settings != self._settings:
+            # Settings changed - sessions opened with the old ones must not be reused
+            self._generation += 1
+            self._close_idle()
+
+        self._settings = settings
+        self._config_mtime = mtime
+        return settings
+
+    def _connect(self, settings):
+        """Open and authenticate a new SMB session"""
+        server_name, share_name, username, password = settings
+        conn = SMBConnection(username, password, "CLIENT", server_name, use_ntlm_v2=True)
+        if not conn.connect(server_name, 445):
+            raise ConnectionError(f"Ni mogoče vzpostaviti povezave s strežnikom {server_name}")
+        print(f"Opened pooled SMB session to {server_name}/{share_name}")
+        return conn
+
+    def _is_alive(self, conn):
+        """Health check for a session that has been idle for a while"""
         try:
-            # Get current version from SMB (this is the blocking operation)
-            current_version = self.parent_window.get_data_version()
-            
-            # Check if update is needed
-            if current_version > self.parent_window.last_known_version:
-                # Load the updated data in background thread
-                print(f"Background: Loading version {current_version}")
-                if self.parent_window.load_shared_data_from_smb():
-                    # Signal that update has been loaded successfully
-                    self.update_available.emit(current_version)
-                else:
-                    print(f"Background: Failed to load version {current_version}")
-            else:
-                # No update needed, just update the known version
-                self.parent_window.last_known_version = current_version
-                
+            conn.echo(b'ping', timeout=5)
+            return True
         except Exception as e:
-            print(f"Error in SMB update worker: {str(e)}")
-        finally:
-            self.update_complete.emit()
-    
-    def stop(self):
-        """Stop the worker thread"""
-        self.running = False
+            print(f"Pooled SMB session failed health check: {str(e)}")
+            return False
 
-class MainWindow(QMainWindow):
-    def __init__(self):
-        super().__init__()
-        self.setWindowTitle("Beleženje delovnega časa Admin")
-        self.setMinimumSize(1200, 800)
-        
-        # Set window icon using absolute path
+    def _close_conn(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _close_idle(self):
+        """Close all idle sessions (caller holds the lock)"""
+        for conn, _ in self._idle:
+            self._generations.pop(conn, None)
+            self._open_count -= 1
+            self._close_conn(conn)
+        self._idle = []
+        self._cond.notify_all()
+
+    def acquire(self, timeout=60):
+        """Get an authenticated session for exclusive use, returns (conn, share_name)"""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._cond:
+                settings = self._load_settings()
+                generation = self._generation
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                elif self._open_count < self.max_size:
+                    self._open_count += 1
+                    conn, last_used = None, None
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise ConnectionError("Vse povezave s SMB strežnikom so zasedene")
+                    self._cond.wait(remaining)
+                    continue
+
+            if conn is None:
+                # Handshake outside the lock so other threads can still reuse idle sessions
+                try:
+                    conn = self._connect(settings)
+                except Exception:
+                    with self._cond:
+                        self._open_count -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._generations[conn] = generation
+                return conn, settings[1]
+
+            if time.monotonic() - last_used < self.idle_check_after or self._is_alive(conn):
+                return conn, settings[1]
+
+            # Dead session - drop it and try again (reconnects if nothing else is idle)
+            self.release(conn, broken=True)
+
+    def release(self, conn, broken=False):
+        """Return a session to the pool, closing it if it is broken or outdated"""
+        with self._cond:
+            if broken or self._generations.get(conn) != self._generation:
+                self._generations.pop(conn, None)
+                self._open_count -= 1
+                self._close_conn(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Context manager yielding (conn, share_name) from the pool"""
+        conn, share_name = self.acquire()
+        broken = False
+        try:
+            yield conn, share_name
+        except self.CONNECTION_ERRORS:
+            broken = True
+            raise
+        finally:
+            self.release(conn, broken)
+
+    def reset(self):
+        """Drop all sessions, e.g. after the SMB settings were changed"""
+        with self._cond:
+            self._generation += 1
+            self._settings = None
+            self._close_idle()
+
+    def close_all(self):
+        """Close all sessions when the application exits"""
+        self.reset()
+
+class TimeRecordsCache:
+    """Local SQLite cache of parsed time_records files, keyed by remote size and last write time"""
+
+    def __init__(self, db_path='time_records_cache.db'):
+        self._lock = threading.Lock()
+        # Used from worker threads as well, all access goes through the lock
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS cached_files (
+                filename TEXT PRIMARY KEY,
+                file_size INTEGER NOT NULL,
+                last_write_time REAL NOT NULL
+            )
+        ''')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS cached_records (
+                filename TEXT NOT NULL,
+                card_id TEXT,
+                timestamp TEXT,
+                status TEXT
+            )
+        ''')
+        self.conn.execute('''
+            CREATE INDEX IF NOT EXISTS idx_cached_records_filename
+            ON cached_records(filename)
+        ''')
+        # Index of the cached files every card appears in
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS card_files (
+                card_id TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                PRIMARY KEY (card_id, filename)
+            )
+        ''')
+        self.conn.execute('''
+            CREATE INDEX IF NOT EXISTS idx_card_files_filename
+            ON card_files(filename)
+        ''')
+        # Caches from older versions already hold the records, build the index from them
+        if self.conn.execute("SELECT 1 FROM card_files LIMIT 1").fetchone() is None:
+            self.conn.execute('''
+                INSERT OR IGNORE INTO card_files (card_id, filename)
+                SELECT DISTINCT card_id, filename FROM cached_records WHERE card_id IS NOT NULL
+            ''')
+        self.conn.commit()
+
+    # Keep IN (...) lists below SQLite's host parameter limit
+    CHUNK_SIZE = 500
+
+    def _select_in(self, sql, filenames, params=()):
+        """Run a SELECT with an IN ({}) placeholder over filenames in sorted chunks, params follow the chunk"""
+        filenames = sorted(filenames)
+        rows = []
+        with self._lock:
+            for i in range(0, len(filenames), self.CHUNK_SIZE):
+                chunk = filenames[i:i + self.CHUNK_SIZE]
+                rows.extend(self.conn.execute(sql.format(','.join('?' * len(chunk))), [*chunk, *params]).fetchall())
+        return rows
+
+    def valid_files(self, listing):
+        """Return the filenames from listing (filename -> (size, mtime)) whose cached copy is current"""
+        rows = self._select_in(
+            "SELECT filename, file_size, last_write_time FROM cached_files WHERE filename IN ({})", listing
+        )
+        return {name for name, size, mtime in rows if tuple(listing[name]) == (size, mtime)}
+
+    def load(self, filenames, card_ids=None):
+        """Load cached rows of the given files as raw CardID/Timestamp/Status strings plus the source filename
+        
+        With card_ids only the rows of those cards are selected in SQLite."""
+        where, params = '', []
+        if card_ids is not None:
+            params = sorted(set(card_ids))
+            where = f" AND card_id IN ({','.join('?' * len(params))})"
+        rows = self._select_in(
+            "SELECT card_id, timestamp, status, filename FROM cached_records WHERE filename IN ({})" + where +
+            " ORDER BY filename, rowid",
+            filenames, params
+        )
+        return pd.DataFrame(rows, columns=['CardID', 'Timestamp', 'Status', 'File'], dtype=object)
+
+    def store(self, filename, file_size, last_write_time, df):
+        """Replace the cached contents of one file with freshly parsed rows"""
+        rows = [
+            (filename, None if pd.isna(card_id) else card_id, None if pd.isna(timestamp) else timestamp,
+             None if pd.isna(status) else status)
+            for card_id, timestamp, status in df[['CardID', 'Timestamp', 'Status']].itertuples(index=False)
+        ]
+        with self._lock:
+            try:
+                self.conn.execute("DELETE FROM cached_records WHERE filename = ?", (filename,))
+                self.conn.executemany(
+                    "INSERT INTO cached_records (filename, card_id, timestamp, status) VALUES (?, ?, ?, ?)", rows
+                )
+                self.conn.execute("DELETE FROM card_files WHERE filename = ?", (filename,))
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO card_files (card_id, filename) VALUES (?, ?)",
+                    {(row[1], filename) for row in rows if row[1] is not None}
+                )
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO cached_files (filename, file_size, last_write_time) VALUES (?, ?, ?)",
+                    (filename, file_size, last_write_time)
+                )
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+
+    def forget(self, filenames):
+        """Drop cached files that no longer exist on the share"""
+        filenames = sorted(filenames)
+        with self._lock:
+            for i in range(0, len(filenames), self.CHUNK_SIZE):
+                chunk = filenames[i:i + self.CHUNK_SIZE]
+                placeholders = ','.join('?' * len(chunk))
+                self.conn.execute(f"DELETE FROM cached_records WHERE filename IN ({placeholders})", chunk)
+                self.conn.execute(f"DELETE FROM card_files WHERE filename IN ({placeholders})", chunk)
+                self.conn.execute(f"DELETE FROM cached_files WHERE filename IN ({placeholders})", chunk)
+            self.conn.commit()
+
+    def files_with_cards(self, card_ids, filenames):
+        """Those of the given cached files that contain records of any of the cards"""
+        rows = self._select_in("SELECT DISTINCT filename FROM card_files WHERE card_id IN ({})", set(card_ids))
+        return {row[0] for row in rows} & set(filenames)
+
+    def cached_filenames(self, start_name, end_name):
+        """Names of all cached files in the given filename range"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT filename FROM cached_files WHERE filename BETWEEN ? AND ?", (start_name, end_name)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+class MonthRecordsCache:
+    """In-memory time records of whole months (all cards), shared by every calendar dialog"""
+    CURRENT_MONTH_TTL = 60  # Seconds, the current month still receives new records
+    CLOSED_MONTH_TTL = 600
+
+    def __init__(self, max_months=6):
+        self.max_months = max_months
+        self._lock = threading.Lock()
+        self._months = {}  # (year, month) -> (loaded_at, DataFrame), oldest use first
+        self._loading = {}  # (year, month) -> threading.Event while a load is running
+        self._generation = 0  # Bumped by invalidate so loads that started earlier are not kept
+
+    def _is_fresh(self, key):
+        entry = self._months.get(key)
+        if entry is None:
+            return False
+        today = datetime.now().date()
+        ttl = self.CLOSED_MONTH_TTL if key < (today.year, today.month) else self.CURRENT_MONTH_TTL
+        return time.monotonic() - entry[0] < ttl
+
+    def get(self, key, loader):
+        """Return the month from memory, or load it with loader(); concurrent loads of one month are shared"""
+        while True:
+            with self._lock:
+                if self._is_fresh(key):
+                    self._months[key] = self._months.pop(key)
+                    return self._months[key][1]
+                event = self._loading.get(key)
+                if event is None:
+                    event = self._loading[key] = threading.Event()
+                    generation = self._generation
+                    break
+            # Another thread is loading this month, wait for it and check again
+            event.wait()
+        
+        try:
+            data = loader()
+            # An empty month may be a failed read, so it is not kept
+            if not data.empty:
+                with self._lock:
+                    if generation != self._generation:
+                        return data
+                    self._months.pop(key, None)
+                    self._months[key] = (time.monotonic(), data)
+                    while len(self._months) > self.max_months:
+                        del self._months[next(iter(self._months))]
+            return data
+        finally:
+            with self._lock:
+                del self._loading[key]
+            event.set()
+
+    def needs_load(self, key):
+        """Check whether the month is neither in memory nor being loaded"""
+        with self._lock:
+            return not self._is_fresh(key) and key not in self._loading
+
+    def invalidate(self, key=None):
+        """Drop one month, or all months when key is None"""
+        with self._lock:
+            self._generation += 1
+            if key is None:
+                self._months.clear()
+            else:
+                self._months.pop(key, None)
+
+class SharedDataJournal:
+    """Append-only journal of shared data changes on the SMB share, compacted into shared_data.json
+    
+    Every save appends one line {"version", "client", "last_updated", "ops"} to shared_changes.jsonl.
+    The first line of the journal is a header that changes on every compaction, so readers can tell
+    whether the bytes they already applied are still valid.
+    
+    Versions follow the position in the journal: an entry written at offset gets the header's snapshot
+    version + offset + 1, and a compacted snapshot gets the version at the end of the journal it folds.
+    Two clients can't end up with the same version, and entries newer than a snapshot have a higher one."""
+    JOURNAL_FILE = "shared_changes.jsonl"
+    SNAPSHOT_FILE = "shared_data.json"
+    VERSION_FILE = "data_version.txt"
+    COMPACT_SIZE = 64 * 1024  # Journal size in bytes after which it is folded into the snapshot
+    HEADER_MAX = 1024  # Bytes read to find the journal header
+    APPEND_ATTEMPTS = 5
+
+    def __init__(self):
+        self.client_id = uuid.uuid4().hex
+        self.header = None  # Journal header when the journal was last read
+        self.offset = 0  # Bytes of the journal that are already applied
+        self.snapshot_loaded = False  # Whether the snapshot on the share was applied to the local database
+
+    def base_version(self):
+        """Snapshot version the applied journal starts from"""
+        return json.loads(self.header.decode('utf-8')).get("snapshot", 0) if self.header else 0
+
+    def file_size(self, conn, share_name, path):
+        """Size of a file on the share or None when it doesn't exist"""
+        try:
+            return conn.getAttributes(share_name, path).file_size
+        except SMBSessionPool.CONNECTION_ERRORS:
+            raise
+        except Exception:
+            return None
+
+    def _read(self, conn, share_name, path, offset=0, max_length=-1):
+        file_obj = io.BytesIO()
+        conn.retrieveFileFromOffset(share_name, path, file_obj, offset, max_length)
+        return file_obj.getvalue()
+
+    def _parse(self, data):
+        """Parse complete journal lines, returns (entries, consumed bytes); damaged lines are skipped"""
+        # A line without a newline is still being written by another client
+        consumed = data.rfind(b'\n') + 1
+        entries = []
+        for line in data[:consumed].splitlines():
+            if not line.strip():
+                continue
+            try:
+                entries.append(json.loads(line.decode('utf-8')))
+            except ValueError:
+                # Left behind by two clients writing at the same offset, both of them wrote their entry again
+                print(f"Skipping damaged journal line: {line[:80]!r}")
+        return entries, consumed
+
+    def _make_header(self, snapshot_version):
+        header = {"snapshot": snapshot_version, "id": uuid.uuid4().hex, "created": datetime.now().isoformat()}
+        return (json.dumps(header) + '\n').encode('utf-8')
+
+    def _read_header(self, conn, share_name):
+        """Header line of the journal on the share and the snapshot version it starts from"""
+        data = self._read(conn, share_name, self.JOURNAL_FILE, 0, self.HEADER_MAX)
+        header = data[:data.find(b'\n') + 1]
+        try:
+            return header, int(json.loads(header.decode('utf-8')).get("snapshot", 0))
+        except ValueError:
+            raise Exception("Glava dnevnika sprememb je poškodovana")
+
+    def read_version(self, conn, share_name):
+        """Latest version written to the share"""
+        try:
+            return int(self._read(conn, share_name, self.VERSION_FILE).decode('utf-8').strip())
+        except SMBSessionPool.CONNECTION_ERRORS:
+            raise
+        except Exception:
+            return 0
+
+    def read_changes(self, conn, share_name):
+        """Read changes this client has not applied yet
+        
+        Returns a payload {"snapshot", "entries", "header", "offset"} for MainWindow.apply_shared_changes,
+        snapshot is None when only the new journal entries are needed. Returns None when the share holds
+        no shared data at all."""
+        size = self.file_size(conn, share_name, self.JOURNAL_FILE)
+        
+        # Only the appended part is read as long as the journal wasn't compacted in the meantime
+        if self.header is not None and size is not None and size >= self.offset:
+            if size == self.offset:
+                return {"snapshot": None, "entries": [], "header": self.header, "offset": self.offset}
+            if self._read(conn, share_name, self.JOURNAL_FILE, 0, len(self.header)) == self.header:
+                entries, consumed = self._parse(self._read(conn, share_name, self.JOURNAL_FILE, self.offset))
+                return {
+                    "snapshot": None,
+                    "entries": [entry for entry in entries if entry.get("client") != self.client_id],
+                    "header": self.header,
+                    "offset": self.offset + consumed
+                }
+        
+        # Start over from the snapshot and the entries written after it
+        try:
+            snapshot = json.loads(self._read(conn, share_name, self.SNAPSHOT_FILE).decode('utf-8'))
+        except SMBSessionPool.CONNECTION_ERRORS:
+            raise
+        except Exception:
+            snapshot = None
+        
+        header, entries, offset = None, [], 0
+        if size:
+            data = self._read(conn, share_name, self.JOURNAL_FILE)
+            header = data[:data.find(b'\n') + 1]
+            entries, consumed = self._parse(data[len(header):])
+            offset = len(header) + consumed
+        snapshot_version = snapshot.get("version", 0) if snapshot else 0
+        entries = [entry for entry in entries if entry.get("version", 0) > snapshot_version]
+        
+        if snapshot is None and not entries:
+            return None
+        return {"snapshot": snapshot, "entries": entries, "header": header or None, "offset": offset}
+
+    def append(self, conn, share_name, entry, snapshot_version):
+        """Append one entry to the journal and give it its version
+        
+        Returns (version, journal size afterwards, caught_up), caught_up tells whether this client
+        had applied every entry before its own. Another client can write at the same offset at the
+        same moment, so the line is read back and written again at the new end when it was overwritten."""
+        for attempt in range(self.APPEND_ATTEMPTS):
+            size = self.file_size(conn, share_name, self.JOURNAL_FILE)
+            if size is None:
+                # A share written before the journal existed holds only the snapshot. A client that hasn't
+                # loaded it is not caught up, and the new entries must still be newer than the snapshot.
+                knows_snapshot = self.header is not None or self.snapshot_loaded
+                if not knows_snapshot and self.file_size(conn, share_name, self.SNAPSHOT_FILE) is not None:
+                    snapshot = json.loads(self._read(conn, share_name, self.SNAPSHOT_FILE).decode('utf-8'))
+                    snapshot_version = max(snapshot_version, snapshot.get("version", 0))
+                else:
+                    knows_snapshot = True
+                header, base, offset = self._make_header(snapshot_version), snapshot_version, None
+            else:
+                header, base = self._read_header(conn, share_name)
+                offset = size
+            position = len(header) if offset is None else offset
+            entry["version"] = base + position + 1
+            line = (json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8')
+            
+            if offset is None:
+                conn.storeFile(share_name, self.JOURNAL_FILE, io.BytesIO(header + line))
+            else:
+                conn.storeFileFromOffset(share_name, self.JOURNAL_FILE, io.BytesIO(line), offset=offset)
+            
+            if self._read(conn, share_name, self.JOURNAL_FILE, position, len(line)) != line:
+                print(f"Journal entry at offset {position} was overwritten by another client, writing it again")
+                continue
+            
+            # Skip our own line unless other clients appended entries we haven't read yet
+            caught_up = knows_snapshot if offset is None else (self.header == header and self.offset == offset)
+            if caught_up:
+                self.header = header
+                self.offset = position + len(line)
+            return entry["version"], position + len(line), caught_up
+        raise Exception("Sprememb ni bilo mogoče zapisati v dnevnik, ker ga hkrati spreminjajo drugi odjemalci")
+
+    def compact(self, conn, share_name, snapshot, journal_size):
+        """Write the snapshot and restart the journal, skipped if another client appended in the meantime"""
+        if self.file_size(conn, share_name, self.JOURNAL_FILE) != journal_size:
+            return False
+        json_data = json.dumps(snapshot, ensure_ascii=False, indent=2)
+        conn.storeFile(share_name, self.SNAPSHOT_FILE, io.BytesIO(json_data.encode('utf-8')))
+        # Entries appended while the snapshot was written are newer than it, keep the journal for them
+        if self.file_size(conn, share_name, self.JOURNAL_FILE) != journal_size:
+            return False
+        header = self._make_header(snapshot["version"])
+        conn.storeFile(share_name, self.JOURNAL_FILE, io.BytesIO(header))
+        self.header = header
+        self.offset = len(header)
+        return True
+
+class SMBUpdateWorker(QThread):
+    """Worker thread for checking SMB updates without blocking the GUI
+    
+    The worker only talks to the share, the downloaded changes are applied to the database by
+    the main thread in handle_update_available (the SQLite connection belongs to the main thread)."""
+    update_available = pyqtSignal(int, object, object)  # Signal with version, downloaded changes (or None) and file metadata
+    update_complete = pyqtSignal(bool)  # Signal whether the sync files changed on the share
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.parent_window = parent
+        self.running = True
+    
+    def run(self):
+        """Check for updates in background thread"""
+        changed = False
+        try:
+            if not self.running or not self.parent_window:
+                return
+            
+            # Compare file metadata first, nothing is downloaded while the sync files are unchanged
+            signature = self.parent_window.read_shared_files_signature()
+            if signature == self.parent_window.shared_files_signature:
+                return
+            changed = True
+            
+            # Get current version from SMB
+            current_version = self.parent_window.get_data_version()
+            
+            # Check if update is needed, the journal can grow while a slower client writes an older version number
+            journal_changed = (self.parent_window.shared_files_signature is None or
+                               signature[1] != self.parent_window.shared_files_signature[1])
+            if current_version > self.parent_window.last_known_version or journal_changed:
+                # Download the changes in background thread, they are applied on the main thread
+                print(f"Background: Downloading version {current_version}")
+                payload = self.parent_window.fetch_shared_changes()
+                if self.running:
+                    self.update_available.emit(current_version, payload, signature)
+            else:
+                # No update needed, just update the known version
+                self.update_available.emit(current_version, None, signature)
+                
+        except Exception as e:
+            print(f"Error in SMB update worker: {str(e)}")
+        finally:
+            self.update_complete.emit(changed)
+    
+    def stop(self):
+        """Stop the worker thread"""
+        self.running = False
+
+class SharedDataSaveWorker(QThread):
+    """Worker thread for uploading shared data changes, retrying with backoff"""
+    save_complete = pyqtSignal(object)  # Signal with the worker itself, result is None after failed retries
+    
+    def __init__(self, parent, tables, ops, max_retries=4):
+        super().__init__(parent)
+        self.parent_window = parent
+        self.tables = tables
+        self.ops = ops
+        self.max_retries = max_retries
+        self.result = None
+        self.handled = False
+        self.running = True
+    
+    def run(self):
+        """Upload in background thread"""
+        delay = 1
+        for attempt in range(self.max_retries):
+            try:
+                self.result = self.parent_window.upload_shared_changes(self.tables, self.ops)
+                break
+            except Exception as e:
+                print(f"Save attempt {attempt + 1} failed: {str(e)}")
+                if attempt == self.max_retries - 1 or not self.running:
+                    break
+                time.sleep(delay)  # Wait before retry
+                delay *= 2
+        self.save_complete.emit(self)
+    
+    def stop(self):
+        """Stop retrying"""
+        self.running = False
+
+class SMBWriteError(Exception):
+    """Raised when replacing a file on the share fails, names the step that failed"""
+
+    def __init__(self, filename, step, error):
+        super().__init__(f"Pisanje datoteke {filename} ni uspelo ({step}): {error}")
+        self.filename = filename
+        self.step = step
+        self.error = error
+
+class SMBWriteConflict(SMBWriteError):
+    """Raised when the file changed on the share after its new content was prepared, the caller reads it again"""
+
+    def __init__(self, filename):
+        super().__init__(filename, "preverjanje", "datoteka se je medtem spremenila")
+
+class ReportCancelled(Exception):
+    """Raised inside a report calculation when the user cancels it"""
+
+class ReportWorker(QThread):
+    """Worker thread for report calculations (SMB reads and pandas work) without blocking the GUI"""
+    progress = pyqtSignal(int, int, str)  # Signal with done, total and a description of the step
+    report_ready = pyqtSignal(object)
+    report_failed = pyqtSignal(str)
+    
+    def __init__(self, task, parent=None):
+        super().__init__(parent)
+        self.task = task
+        self.running = True
+    
+    def run(self):
+        """Run the calculation in background thread"""
+        try:
+            result = self.task(self.progress.emit, self.is_cancelled)
+            if self.running:
+                self.report_ready.emit(result)
+        except ReportCancelled:
+            print("Report calculation cancelled")
+        except Exception as e:
+            print(f"Error in report worker: {str(e)}")
+            import traceback
+            print(traceback.format_exc())
+            self.report_failed.emit(str(e))
+    
+    def is_cancelled(self):
+        """Check whether the calculation was cancelled"""
+        return not self.running
+    
+    def stop(self):
+        """Cancel the calculation, the worker stops at the next file or employee"""
+        self.running = False
+
+class MainWindow(QMainWindow):
+    # Tables synchronized through the share and their columns, in insert order
+    SHARED_TABLES = {
+        'groups': ('id', 'name'),
+        'employees': ('id', 'name', 'card_id', 'daily_hours', 'group_id'),
+        'special_days': ('id', 'card_id', 'date', 'type'),
+    }
+    # Journal operations name rows by these columns, the AUTOINCREMENT ids differ between PCs
+    SHARED_KEYS = {
+        'groups': ('name',),
+        'employees': ('card_id',),
+        'special_days': ('card_id', 'date'),
+    }
+    
+    # Update checks back off while the shared data doesn't change
+    UPDATE_INTERVAL_MIN = 30000
+    UPDATE_INTERVAL_MAX = 300000
+    
+    # Local changes are uploaded after this quiet period, failed uploads are retried later
+    SYNC_DELAY = 2000
+    SYNC_RETRY_DELAY = 60000
+    
+    # Files on the share are replaced through a temp file; older leftovers are from interrupted writes
+    TEMP_PREFIX = "temp_"
+    STALE_TEMP_AGE = 300
+    RENAME_ATTEMPTS = 3
+    APPEND_ATTEMPTS = 3
+    
+    # Closed months are also stored as one compressed roll-up, read when at least this many days are needed
+    ROLLUP_MIN_FILES = 2
+    # Only the client holding the lock file writes roll-ups, a lock older than ROLLUP_LOCK_AGE seconds is
+    # left from a client that stopped; one run writes at most ROLLUP_MONTHS_PER_RUN months
+    ROLLUP_LOCK_FILE = "time_records_rollup.lock"
+    ROLLUP_LOCK_AGE = 1800
+    ROLLUP_MONTHS_PER_RUN = 3
+    
+    STARTUP_SYNC_STATUS = "Nalaganje podatkov iz SMB ..."
+    STARTUP_SYNC_FAILED_STATUS = "Podatkov iz SMB ni bilo mogoče naložiti, prikazani so lokalni podatki"
+
+    def __init__(self):
+        super().__init__()
+        # Startup phases (first paint, fresh shared data) in ms since the window was created
+        self.startup_started = time.perf_counter()
+        self.startup_timings = {}
+        
+        self.setWindowTitle("Beleženje delovnega časa Admin")
+        self.setMinimumSize(1200, 800)
+        
+        # Set window icon using absolute path
         icon_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'icon.ico')
         if os.path.exists(icon_path):
             try:
@@ -2100,6 +2864,18 @@ class MainWindow(QMainWindow):
         # Initialize database
         self.init_database()
         
+        # Shared pool of SMB sessions used by every reader and writer
+        self.smb_pool = SMBSessionPool()
+        
+        # Local cache of already downloaded time_records files
+        self.records_cache = TimeRecordsCache()
+        
+        # Whole months of time records shared by calendar dialogs of all employees
+        self.month_records = MonthRecordsCache()
+        
+        # Temp files of interrupted writes are looked for before the first write
+        self.temp_files_checked = False
+        
         # Create toolbar
         self.toolbar = self.addToolBar("Toolbar")
         self.toolbar.setMovable(False)
@@ -2236,18 +3012,44 @@ class MainWindow(QMainWindow):
         # Initialize multi-user synchronization
         self.last_known_version = 0
         self.data_version = 0
+        self.shared_journal = SharedDataJournal()
+        self.shared_files_signature = None  # Metadata of the sync files when they were last read
+        # Shared tables as last synced; until the first sync that is the local database, so edits
+        # made before it completes are uploaded as changes instead of the whole database. When the
+        # first check finds no shared data on the share, the whole database is uploaded to seed it.
+        self.synced_state = self.read_shared_tables()
+        self.first_sync_pending = True
         
         # Initialize worker thread for background SMB updates
         self.update_worker = None
         self.update_in_progress = False
         
+        # Worker thread for report calculations
+        self.report_worker = None
+        
+        # Write-behind upload of local changes
+        self.save_worker = None
+        self.sync_timer = QTimer()
+        self.sync_timer.setSingleShot(True)
+        self.sync_timer.timeout.connect(self.flush_shared_data)
+        self.sync_status_label = QLabel()
+        self.statusBar().addPermanentWidget(self.sync_status_label)
+        
         # Add timer for periodic update checks
         self.update_timer = QTimer()
         self.update_timer.timeout.connect(self.check_for_updates)
-        self.update_timer.start(30000)  # Check every 30 seconds
-        
-        # Load shared data on startup
-        self.load_shared_data_from_smb()
+        self.update_interval = self.UPDATE_INTERVAL_MIN
+        self.update_timer.start(self.update_interval)
+        
+        # The tables show the local database right away, the first sync runs on the update worker
+        # and patches them when it completes
+        self.set_sync_status(self.STARTUP_SYNC_STATUS)
+        QTimer.singleShot(0, self.check_for_updates)
+        
+        # Consolidate closed months into roll-up files without blocking the window
+        self.compaction_stop = threading.Event()
+        self.compaction_thread = threading.Thread(target=self.compact_closed_months, daemon=True)
+        self.compaction_thread.start()
 
     def show_settings(self):
         """Show settings dialog"""
@@ -2262,9 +3064,20 @@ class MainWindow(QMainWindow):
     def manual_refresh(self):
         """Manually refresh data from SMB share"""
         try:
+            if self.sync_timer.isActive() or (self.save_worker and self.save_worker.isRunning()):
+                # A reload would overwrite local changes that aren't uploaded yet, upload them first
+                if self.sync_timer.isActive():
+                    self.sync_timer.stop()
+                    self.flush_shared_data()
+                QMessageBox.information(self, "Osvežitev", "Lokalne spremembe se še shranjujejo. "
+                                        "Podatke osvežite znova, ko bo shranjevanje končano.")
+                return
             if self.load_shared_data_from_smb():
                 self.update_employee_table()
                 self.update_groups_list()
+                # Check often again for a while
+                self.update_interval = self.UPDATE_INTERVAL_MIN
+                self.update_timer.setInterval(self.update_interval)
                 QMessageBox.information(self, "Uspeh", "Podatki so bili uspešno osveženi!")
             else:
                 QMessageBox.warning(self, "Napaka", "Ni mogoče naložiti podatkov iz SMB shrambe.")
@@ -2324,16 +3137,41 @@ class MainWindow(QMainWindow):
         # Add search box above the employee table
         search_layout = QHBoxLayout()
         self.name_search_box = QLineEdit()
-        self.name_search_box.setPlaceholderText("Poišči po imenu")
+        self.name_search_box.setPlaceholderText("Poišči po imenu ali ID kartice")
         search_layout.addWidget(self.name_search_box)
         layout.addLayout(search_layout)
         
         # Create table for employee data (remove S.P. column)
-        self.employee_table = QTableWidget()
-        self.employee_table.setColumnCount(6)
-        self.employee_table.setHorizontalHeaderLabels([
-            "Ime delavca", "ID kartice", "Dnevni delovni čas", "Skupina", "Akcije", "SMB"
-        ])
+        # Editors and buttons are painted by delegates, so no widgets are created per employee
+        self.employee_model = EmployeeTableModel(self)
+        self.employee_model.employee_edited.connect(self.on_employee_edited)
+        self.employee_proxy = EmployeeFilterProxyModel(self)
+        self.employee_proxy.setSourceModel(self.employee_model)
+        self.name_search_box.textChanged.connect(self.employee_proxy.set_query)
+        self.employee_table = QTableView()
+        self.employee_table.setModel(self.employee_proxy)
+        self.employee_table.setEditTriggers(QAbstractItemView.EditTrigger.EditKeyPressed)
+        self.employee_table.setItemDelegateForColumn(
+            EmployeeTableModel.HOURS_COLUMN, ComboBoxDelegate(self.employee_model.hours_options, self.employee_table))
+        self.employee_table.setItemDelegateForColumn(
+            EmployeeTableModel.GROUP_COLUMN, ComboBoxDelegate(self.employee_model.group_options, self.employee_table))
+        self.employee_actions_delegate = ActionButtonsDelegate([
+            ('calendar', "📅", 'calendar.png', None),
+            ('card', "ID", 'lostcard.png', "Spremeni ID"),
+            ('archive', "📦", 'archive.png', "Arhiviraj delavca"),
+            ('calc', "Izračunaj delovni čas", None, None),
+            ('overtime', "Pokaži nadure", None, None),
+            ('shortage', "Pokaži manjko ur", None, None),
+            ('delete', "Izbriši delavca", None, None),
+        ], self.employee_table)
+        self.employee_smb_delegate = ActionButtonsDelegate([
+            ('delete_timestamps', "🗑️", 'trashcan.png', "Izbriši delavca iz shrambe"),
+        ], self.employee_table)
+        for delegate in (self.employee_actions_delegate, self.employee_smb_delegate):
+            delegate.action_triggered.connect(self.on_employee_action)
+        self.employee_table.setItemDelegateForColumn(4, self.employee_actions_delegate)
+        self.employee_table.setItemDelegateForColumn(5, self.employee_smb_delegate)
+        
         # Set column widths
         self.employee_table.setColumnWidth(0, 200)  # Name
         self.employee_table.setColumnWidth(1, 150)  # Card ID
@@ -2377,28 +3215,50 @@ class MainWindow(QMainWindow):
         self.update_groups_list()
 
     def update_groups_list(self):
-        """Update the groups list display"""
+        """Update the groups list display, changing only the rows of groups that changed"""
         try:
-            self.groups_list.setRowCount(0)
             self.cursor.execute("SELECT id, name FROM groups ORDER BY name")
             groups = self.cursor.fetchall()
             
-            if groups:
-                for group_id, name in groups:
-                    row_position = self.groups_list.rowCount()
-                    self.groups_list.insertRow(row_position)
-                    self.groups_list.setItem(row_position, 0, QTableWidgetItem(name))
+            # Rows are matched by the group id kept in the name item
+            def row_group_id(row):
+                item = self.groups_list.item(row, 0)
+                return item.data(Qt.ItemDataRole.UserRole) if item else None
+            
+            group_ids = {group_id for group_id, _ in groups}
+            for row in range(self.groups_list.rowCount() - 1, -1, -1):
+                if row_group_id(row) not in group_ids:
+                    self.groups_list.removeRow(row)
+            
+            for position, (group_id, name) in enumerate(groups):
+                current = next((row for row in range(position, self.groups_list.rowCount())
+                                if row_group_id(row) == group_id), None)
+                if current is not None and current != position:
+                    self.groups_list.removeRow(current)
+                    current = None
+                if current is None:
+                    self.groups_list.insertRow(position)
+                    name_item = QTableWidgetItem(name)
+                    name_item.setData(Qt.ItemDataRole.UserRole, group_id)
+                    self.groups_list.setItem(position, 0, name_item)
                     
                     delete_button = QPushButton("Izbriši")
                     delete_button.clicked.connect(lambda checked, gid=group_id: self.delete_group(gid))
-                    self.groups_list.setCellWidget(row_position, 1, delete_button)
+                    self.groups_list.setCellWidget(position, 1, delete_button)
+                elif self.groups_list.item(position, 0).text() != name:
+                    self.groups_list.item(position, 0).setText(name)
             
-            # Also update the group combo box in the calculation tab
+            # Also update the group combo box in the calculation tab, keeping the selected group
             if hasattr(self, 'group_combo'):
-                self.group_combo.clear()
-                self.group_combo.addItem("Vsi zaposleni", None)
-                for group_id, name in groups:
-                    self.group_combo.addItem(name, group_id)
+                options = [("Vsi zaposleni", None)] + [(name, group_id) for group_id, name in groups]
+                current_options = [(self.group_combo.itemText(i), self.group_combo.itemData(i))
+                                   for i in range(self.group_combo.count())]
+                if options != current_options:
+                    selected = self.group_combo.currentData()
+                    self.group_combo.clear()
+                    for name, group_id in options:
+                        self.group_combo.addItem(name, group_id)
+                    self.group_combo.setCurrentIndex(max(self.group_combo.findData(selected), 0))
         except Exception as e:
             QMessageBox.critical(self, "Napaka", f"Napaka pri posodabljanju seznama skupin: {str(e)}")
             print(f"Error in update_groups_list: {str(e)}")
@@ -2427,8 +3287,7 @@ class MainWindow(QMainWindow):
     def calculate_overtime(self, card_id, daily_hours):
         """Calculate overtime hours for an employee"""
         def on_dates_selected(start_date, end_date):
-            result = self.calculate_working_hours(card_id, start_date, end_date)
-            if result is not None:
+            def on_result(result):
                 # Check if employee has flexible hours
                 if daily_hours == -1:
                     QMessageBox.information(self, "Opozorilo", "Delavec ima gibljivi delovni čas. Nadure niso izračunane.")
@@ -2447,13 +3306,13 @@ class MainWindow(QMainWindow):
                 summary = f"Skupaj nadur za izbrano obdobje: {total_overtime:.2f} ur"
                 dialog = ResultsDialog(result, summary)
                 dialog.exec()
+            self.run_employee_report(card_id, start_date, end_date, on_result)
         self.show_calendar_dialog(on_dates_selected)
 
     def calculate_shortage(self, card_id, daily_hours):
         """Calculate shortage hours for an employee"""
         def on_dates_selected(start_date, end_date):
-            result = self.calculate_working_hours(card_id, start_date, end_date)
-            if result is not None:
+            def on_result(result):
                 # Check if employee has flexible hours
                 if daily_hours == -1:
                     QMessageBox.information(self, "Opozorilo", "Delavec ima gibljivi delovni čas. Manjko ur ni izračunano.")
@@ -2476,6 +3335,7 @@ class MainWindow(QMainWindow):
                 summary = f"Skupaj manjko ur za izbrano obdobje: {undertime:.2f} ur"
                 dialog = ResultsDialog(result, summary)
                 dialog.exec()
+            self.run_employee_report(card_id, start_date, end_date, on_result)
         self.show_calendar_dialog(on_dates_selected)
 
     def init_group_calc_tab(self):
@@ -2552,95 +3412,29 @@ class MainWindow(QMainWindow):
                 QMessageBox.warning(self, "Opozorilo", "Ni delavcev za izračun.")
                 return
             
-            all_results = []
-            for card_id, name, daily_hours in employees:
-                result = self.calculate_working_hours(card_id, start_date, end_date)
-                if result is not None:
-                    # Calculate summary statistics
-                    total_days = len(result)
-                    total_hours = result['Delovne ure'].sum()
-                    
-                    # Count days with different statuses
-                    shortage_days = len(result[result['Status'].str.startswith('Manjko ur')])
-                    overtime_days = len(result[result['Status'].str.startswith('Nadure')])
-                    
-                    # Get special days from database
-                    self.cursor.execute("""
-                        SELECT type, COUNT(*) as count
-                        FROM special_days
-                        WHERE card_id = ? AND date BETWEEN ? AND ?
-                        GROUP BY type
-                    """, (card_id, start_date, end_date))
-                    
-                    special_days = self.cursor.fetchall()
-                    sick_leave_days = 0
-                    vacation_days = 0
-                    
-                    for day_type, count in special_days:
-                        if day_type == 'sick_leave':
-                            sick_leave_days = count
-                        elif day_type == 'vacation':
-                            vacation_days = count
-                    
-                    # Calculate overtime and shortage hours if checkboxes are selected
-                    overtime_hours = 0
-                    shortage_hours = 0
-                    
-                    if self.calc_overtime.isChecked():
-                        overtime_hours = result[result['Status'].str.startswith('Nadure')]['Delovne ure'].sum() - (daily_hours * overtime_days)
-                    
-                    if self.calc_shortage.isChecked():
-                        shortage_hours = (daily_hours * shortage_days) - result[result['Status'].str.startswith('Manjko ur')]['Delovne ure'].sum()
-                    
-                    # Calculate net hours (Skupaj) if at least one is checked
-                    net_hours = None
-                    if self.calc_overtime.isChecked() or self.calc_shortage.isChecked():
-                        net_hours = round(overtime_hours - shortage_hours, 2)
-                    
-                    # Create summary row
-                    summary_row = {
-                        'Številka kartice': card_id,
-                        'Ime delavca': name,
-                        'Dnevni delovni čas': 'Gibljiv' if daily_hours == -1 else str(daily_hours),
-                        'Skupno delovnih dni': total_days,
-                        'Skupno delovnih ur': round(total_hours, 2),
-                        'Dnevi z manjko ur': shortage_days,
-                        'Dnevi z nadurami': overtime_days,
-                        'Bolniški stalež - št. dni': sick_leave_days,
-                        'Dopust - št. dni': vacation_days
-                    }
-                    
-                    # Add optional columns if checkboxes are selected
-                    if self.calc_overtime.isChecked():
-                        summary_row['Nadure'] = round(overtime_hours, 2)
-                    
-                    if self.calc_shortage.isChecked():
-                        summary_row['Manjko ur'] = round(shortage_hours, 2)
-                    
-                    if net_hours is not None:
-                        summary_row['Neto ur'] = net_hours
-                    
-                    all_results.append(summary_row)
-            
-            if not all_results:
-                QMessageBox.warning(self, "Opozorilo", "Ni podatkov za izračun.")
-                return
-            
-            # Create DataFrame from results
-            result_df = pd.DataFrame(all_results)
+            def on_finished(results, all_results):
+                if not all_results:
+                    QMessageBox.warning(self, "Opozorilo", "Ni podatkov za izračun.")
+                    return
+                
+                # Create DataFrame from results
+                result_df = pd.DataFrame(all_results)
+                
+                # Show results without summary
+                dialog = ResultsDialog(result_df)
+                dialog.exec()
             
-            # Show results without summary
-            dialog = ResultsDialog(result_df)
-            dialog.exec()
+            self.run_report(
+                employees, start_date, end_date, on_finished,
+                include_overtime=self.calc_overtime.isChecked(),
+                include_shortage=self.calc_shortage.isChecked()
+            )
         
         self.show_calendar_dialog(on_dates_selected)
 
     def update_employee_table(self):
         """Update the employee table with current data from the database"""
         try:
-            # Clear the table
-            self.employee_table.setRowCount(0)
-            
             # Get all employees with their group names (remove sp_enabled)
             self.cursor.execute("""
                 SELECT e.id, e.name, e.card_id, e.daily_hours, g.id as group_id, g.name as group_name
@@ -2654,202 +3448,7 @@ class MainWindow(QMainWindow):
             self.cursor.execute("SELECT id, name FROM groups ORDER BY name")
             groups = self.cursor.fetchall()
             
-            for employee in employees:
-                row_position = self.employee_table.rowCount()
-                self.employee_table.insertRow(row_position)
-                
-                # Always set a QTableWidgetItem for the name column
-                name_item = QTableWidgetItem(employee[1])
-                self.employee_table.setItem(row_position, 0, name_item)
-                
-                # Add employee data for card ID
-                self.employee_table.setItem(row_position, 1, QTableWidgetItem(employee[2]))  # Card ID
-                
-                # Create and add daily hours combo box
-                hours_combo = QComboBox()
-                hours_combo.addItem("Gibljivi delovni čas", -1)
-                for hours in range(1, 13):  # 1 to 12 hours
-                    hours_combo.addItem(f"{hours} ur", hours)
-                
-                # Set current hours
-                current_hours = employee[3]
-                if current_hours == -1:
-                    hours_combo.setCurrentText("Gibljivi delovni čas")
-                else:
-                    hours_combo.setCurrentText(f"{int(current_hours)} ur")
-                
-                # Connect combo box change to update database
-                def on_hours_changed(combo, emp_id):
-                    new_hours = combo.currentData()
-                    try:
-                        self.cursor.execute("UPDATE employees SET daily_hours = ? WHERE id = ?", 
-                                          (new_hours, emp_id))
-                        self.conn.commit()
-                        
-                        # Save shared data to SMB
-                        self.save_shared_data_with_retry()
-                    except Exception as e:
-                        QMessageBox.critical(self, "Napaka", f"Napaka pri posodabljanju delovnega časa: {str(e)}")
-                
-                hours_combo.currentIndexChanged.connect(
-                    lambda index, combo=hours_combo, emp_id=employee[0]: on_hours_changed(combo, emp_id)
-                )
-                
-                self.employee_table.setCellWidget(row_position, 2, hours_combo)
-                
-                # Create and add group combo box
-                group_combo = QComboBox()
-                group_combo.addItem("", None)  # Empty option for no group
-                for group_id, group_name in groups:
-                    group_combo.addItem(group_name, group_id)
-                
-                # Set current group if exists
-                if employee[4]:  # if group_id exists
-                    index = group_combo.findData(employee[4])
-                    if index >= 0:
-                        group_combo.setCurrentIndex(index)
-                
-                def on_group_changed(combo, emp_id):
-                    new_group_id = combo.currentData()
-                    try:
-                        self.cursor.execute("UPDATE employees SET group_id = ? WHERE id = ?", 
-                                          (new_group_id, emp_id))
-                        self.conn.commit()
-                        
-                        # Save shared data to SMB
-                        self.save_shared_data_with_retry()
-                    except Exception as e:
-                        QMessageBox.critical(self, "Napaka", f"Napaka pri posodabljanju skupine: {str(e)}")
-                group_combo.currentIndexChanged.connect(
-                    lambda index, combo=group_combo, emp_id=employee[0]: on_group_changed(combo, emp_id)
-                )
-                self.employee_table.setCellWidget(row_position, 3, group_combo)
-                
-                # Add action buttons
-                button_widget = QWidget()
-                button_layout = QHBoxLayout(button_widget)
-                button_layout.setContentsMargins(0, 0, 0, 0)
-                button_layout.setSpacing(2)
-                
-                calendar_button = QPushButton()
-                calendar_icon_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'calendar.png')
-                # Add error handling for icon loading
-                if os.path.exists(calendar_icon_path):
-                    try:
-                        icon = QIcon(calendar_icon_path)
-                        if not icon.isNull():
-                            calendar_button.setIcon(icon)
-                        else:
-                            print(f"Warning: calendar.png could not be loaded as icon at {calendar_icon_path}")
-                            # Fallback to text
-                            calendar_button.setText("📅")
-                    except Exception as e:
-                        print(f"Error loading calendar.png: {str(e)}")
-                        # Fallback to text
-                        calendar_button.setText("📅")
-                else:
-                    print(f"Warning: calendar.png not found at {calendar_icon_path}")
-                    # Fallback to text
-                    calendar_button.setText("📅")
-                calendar_button.clicked.connect(lambda checked, cid=employee[2]: self.show_calendar(cid))
-                button_layout.addWidget(calendar_button)
-                
-                # Add lost card button
-                lost_card_button = QPushButton()
-                lost_card_icon_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lostcard.png')
-                # Add error handling for icon loading
-                if os.path.exists(lost_card_icon_path):
-                    try:
-                        icon = QIcon(lost_card_icon_path)
-                        if not icon.isNull():
-                            lost_card_button.setIcon(icon)
-                        else:
-                            print(f"Warning: lostcard.png could not be loaded as icon at {lost_card_icon_path}")
-                            # Fallback to text
-                            lost_card_button.setText("ID")
-                    except Exception as e:
-                        print(f"Error loading lostcard.png: {str(e)}")
-                        # Fallback to text
-                        lost_card_button.setText("ID")
-                else:
-                    print(f"Warning: lostcard.png not found at {lost_card_icon_path}")
-                    # Fallback to text
-                    lost_card_button.setText("ID")
-                lost_card_button.setToolTip("Spremeni ID")
-                lost_card_button.clicked.connect(lambda checked, cid=employee[2], name=employee[1]: self.show_change_card_id_dialog(cid, name))
-                button_layout.addWidget(lost_card_button)
-                
-                # Add archive button
-                archive_button = QPushButton()
-                archive_icon_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'archive.png')
-                # Add error handling for icon loading
-                if os.path.exists(archive_icon_path):
-                    try:
-                        icon = QIcon(archive_icon_path)
-                        if not icon.isNull():
-                            archive_button.setIcon(icon)
-                        else:
-                            print(f"Warning: archive.png could not be loaded as icon at {archive_icon_path}")
-                            # Fallback to text
-                            archive_button.setText("📦")
-                    except Exception as e:
-                        print(f"Error loading archive.png: {str(e)}")
-                        # Fallback to text
-                        archive_button.setText("📦")
-                else:
-                    print(f"Warning: archive.png not found at {archive_icon_path}")
-                    # Fallback to text
-                    archive_button.setText("📦")
-                archive_button.setToolTip("Arhiviraj delavca")
-                archive_button.clicked.connect(lambda checked, cid=employee[2], name=employee[1]: self.archive_worker_data(cid, name))
-                button_layout.addWidget(archive_button)
-                
-                calc_button = QPushButton("Izračunaj delovni čas")
-                overtime_button = QPushButton("Pokaži nadure")
-                shortage_button = QPushButton("Pokaži manjko ur")
-                delete_button = QPushButton("Izbriši delavca")
-                
-                # Add trashcan button for deleting timestamps from SMB
-                trashcan_button = QPushButton()
-                trashcan_icon_path = os.path.join(os.path.dirname(__file__), "trashcan.png")
-                if os.path.exists(trashcan_icon_path):
-                    try:
-                        trashcan_icon = QIcon(trashcan_icon_path)
-                        trashcan_button.setIcon(trashcan_icon)
-                        trashcan_button.setIconSize(QSize(20, 20))
-                    except Exception as e:
-                        print(f"Error loading trashcan.png: {str(e)}")
-                        # Fallback to text
-                        trashcan_button.setText("🗑️")
-                else:
-                    print(f"Warning: trashcan.png not found at {trashcan_icon_path}")
-                    # Fallback to text
-                    trashcan_button.setText("🗑️")
-                trashcan_button.setToolTip("Izbriši delavca iz shrambe")
-                trashcan_button.clicked.connect(lambda checked, cid=employee[2], name=employee[1]: self.delete_worker_timestamps(cid, name))
-                
-                calc_button.clicked.connect(lambda checked, cid=employee[2]: self.calculate_employee_hours(cid))
-                overtime_button.clicked.connect(lambda checked, cid=employee[2], hours=employee[3]: self.calculate_overtime(cid, hours))
-                shortage_button.clicked.connect(lambda checked, cid=employee[2], hours=employee[3]: self.calculate_shortage(cid, hours))
-                delete_button.clicked.connect(lambda checked, emp_id=employee[0], emp_name=employee[1]: self.delete_employee(emp_id, emp_name))
-                
-                button_layout.addWidget(calc_button)
-                button_layout.addWidget(overtime_button)
-                button_layout.addWidget(shortage_button)
-                button_layout.addWidget(delete_button)
-                
-                self.employee_table.setCellWidget(row_position, 4, button_widget)
-                
-                # Add trashcan button to SMB column
-                self.employee_table.setCellWidget(row_position, 5, trashcan_button)
-
-                # Set tooltip for all cells in this row to the worker's name
-                for col in range(self.employee_table.columnCount()):
-                    item = self.employee_table.item(row_position, col)
-                    if item is None:
-                        item = QTableWidgetItem()
-                        self.employee_table.setItem(row_position, col, item)
-                    item.setToolTip(employee[1])
+            self.employee_model.set_data(employees, groups)
             
             # Reconnect the search box signal to ensure it works after table update
             try:
@@ -2861,11 +3460,46 @@ class MainWindow(QMainWindow):
             QMessageBox.critical(self, "Napaka", f"Napaka pri posodabljanju tabele: {str(e)}")
             print(f"Error in update_employee_table: {str(e)}")
 
-
-    def delete_employee(self, employee_id, employee_name):
-        """Delete an employee from the database"""
-        reply = QMessageBox.question(
-            self,
+    def on_employee_edited(self, employee_id, field, value):
+        """Store daily hours or group changed in the employee table"""
+        try:
+            self.cursor.execute(f"UPDATE employees SET {field} = ? WHERE id = ?", (value, employee_id))
+            self.conn.commit()
+            
+            # Save shared data to SMB
+            self.save_shared_data_with_retry()
+        except Exception as e:
+            if field == 'daily_hours':
+                QMessageBox.critical(self, "Napaka", f"Napaka pri posodabljanju delovnega časa: {str(e)}")
+            else:
+                QMessageBox.critical(self, "Napaka", f"Napaka pri posodabljanju skupine: {str(e)}")
+
+    def on_employee_action(self, action, row):
+        """Run the action of a button clicked in the employee table (row of the filtered view)"""
+        row = self.employee_proxy.mapToSource(self.employee_proxy.index(row, 0)).row()
+        employee_id, name, card_id, daily_hours = self.employee_model.rows[row][:4]
+        if action == 'calendar':
+            self.show_calendar(card_id)
+        elif action == 'card':
+            self.show_change_card_id_dialog(card_id, name)
+        elif action == 'archive':
+            self.archive_worker_data(card_id, name)
+        elif action == 'calc':
+            self.calculate_employee_hours(card_id)
+        elif action == 'overtime':
+            self.calculate_overtime(card_id, daily_hours)
+        elif action == 'shortage':
+            self.calculate_shortage(card_id, daily_hours)
+        elif action == 'delete':
+            self.delete_employee(employee_id, name)
+        elif action == 'delete_timestamps':
+            self.delete_worker_timestamps(card_id, name)
+
+
+    def delete_employee(self, employee_id, employee_name):
+        """Delete an employee from the database"""
+        reply = QMessageBox.question(
+            self,
             "Potrditev brisanja",
             f"Ali ste prepričani, da želite izbrisati delavca {employee_name}?",
             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
@@ -3039,8 +3673,7 @@ class MainWindow(QMainWindow):
         try:
             def on_dates_selected(start_date, end_date):
                 try:
-                    result = self.calculate_working_hours(card_id, start_date, end_date)
-                    if result is not None:
+                    def on_result(result):
                         # Calculate total hours
                         total_hours = result['Delovne ure'].sum()
                         total_days = len(result)
@@ -3083,6 +3716,7 @@ class MainWindow(QMainWindow):
                         # Create and show the results dialog
                         dialog = ResultsDialog(result, summary)
                         dialog.exec()
+                    self.run_employee_report(card_id, start_date, end_date, on_result)
                 except Exception as e:
                     QMessageBox.critical(self, "Napaka", f"Napaka pri izračunu: {str(e)}")
                     print(f"Error in on_dates_selected: {str(e)}")
@@ -3258,117 +3892,440 @@ class MainWindow(QMainWindow):
             QMessageBox.critical(self, "Napaka", f"Napaka pri uvozu konfiguracije: {str(e)}")
             print(f"Error in import_configuration: {str(e)}")
 
-    def read_smb_files(self, start_date, end_date):
-        """Read CSV files from SMB share for the given date range"""
-        try:
-            # Get settings from config file
-            config = configparser.ConfigParser()
-            if not os.path.exists('config.ini'):
-                raise ValueError("Nastavitve niso bile najdene. Najprej nastavite SMB povezavo.")
-            
-            config.read('config.ini')
-            if 'SMB' not in config:
-                raise ValueError("Nastavitve SMB niso bile najdene. Najprej nastavite SMB povezavo.")
-            
-            smb_path = config['SMB'].get('path', '')
-            if not smb_path.startswith('\\\\'):
-                raise ValueError("Neveljavna SMB pot")
-            
-            server_name = smb_path.split('\\')[2]
-            share_name = smb_path.split('\\')[3]
-            
-            # Get authentication settings
-            username = config['SMB'].get('username', '')
-            password = config['SMB'].get('password', '')
-            
-            # Connect to SMB share
-            conn = SMBConnection(username, password, "CLIENT", server_name, use_ntlm_v2=True)
-            connected = conn.connect(server_name, 445)
-            
-            if not connected:
-                raise ConnectionError("Ni mogoče vzpostaviti povezave s strežnikom")
-            
-            # Get list of files
-            files = []
-            current_date = start_date
-            while current_date <= end_date:
-                filename = f"time_records_{current_date.strftime('%Y%m%d')}.csv"
-                files.append(filename)
-                current_date += timedelta(days=1)
+    def list_time_record_files(self, conn, share_name):
+        """List all daily time_records files in one round trip as filename -> (file_size, last_write_time)"""
+        files = conn.listPath(share_name, '/', pattern='time_records_*.csv')
+        return {
+            f.filename: (f.file_size, f.last_write_time)
+            for f in files
+            if not f.isDirectory and re.fullmatch(r'time_records_\d{8}\.csv', f.filename)
+        }
+
+    def write_smb_file(self, conn, share_name, filename, data, expected=None, merge=None):
+        """Replace a file on the share by writing a temp file and renaming it over the original
+        
+        pysmb's rename doesn't overwrite an existing file, so the original is deleted right before
+        the rename. With expected (size, last write time) the original is compared again before it is
+        deleted and SMBWriteConflict is raised when it changed. When another client creates the file
+        between the delete and the rename, merge(data, current) gives the content to write instead,
+        without merge the new content replaces it. A temp file left behind by an interrupted write is
+        handled by clean_stale_temp_files."""
+        if not self.temp_files_checked:
+            self.clean_stale_temp_files(conn, share_name)
+        
+        temp_filename = f"{self.TEMP_PREFIX}{filename}"
+        
+        def check_original():
+            if self.time_record_signature(conn, share_name, filename) != expected:
+                self.delete_smb_file(conn, share_name, temp_filename)
+                raise SMBWriteConflict(filename)
+        
+        steps = [("zapis začasne datoteke", lambda: conn.storeFile(share_name, temp_filename, io.BytesIO(data)))]
+        if expected is not None:
+            steps.append(("preverjanje", check_original))
+        steps.append(("brisanje stare datoteke", lambda: self.delete_smb_file(conn, share_name, filename)))
+        for step, action in steps:
+            try:
+                action()
+            except SMBWriteConflict:
+                raise
+            except SMBSessionPool.CONNECTION_ERRORS:
+                print(f"Connection lost while writing {filename} ({step})")
+                raise
+            except Exception as e:
+                raise SMBWriteError(filename, step, e) from e
+        
+        step = "preimenovanje začasne datoteke"
+        for attempt in range(self.RENAME_ATTEMPTS):
+            try:
+                conn.rename(share_name, temp_filename, filename)
+                return
+            except SMBSessionPool.CONNECTION_ERRORS:
+                print(f"Connection lost while writing {filename} ({step})")
+                raise
+            except Exception as e:
+                error = e
             
-            # Read and process files
-            all_data = []
-            for file in files:
+            # The rename only fails on its own when another client created the file in the meantime
+            try:
+                if self.time_record_signature(conn, share_name, filename) is None:
+                    break
+                print(f"{filename} was created while it was being replaced, merging it into the new content")
+                if merge is not None:
+                    file_obj = io.BytesIO()
+                    conn.retrieveFile(share_name, filename, file_obj)
+                    data = merge(data, file_obj.getvalue())
+                    conn.storeFile(share_name, temp_filename, io.BytesIO(data))
+                self.delete_smb_file(conn, share_name, filename)
+            except SMBSessionPool.CONNECTION_ERRORS:
+                raise
+            except Exception as e:
+                error = e
+                break
+        raise SMBWriteError(filename, step, error)
+
+    def merge_time_records(self, data, current):
+        """Content of a day file with the records of a file that was created meanwhile added at the end"""
+        if data and not data.endswith(b'\n'):
+            data += b'\n'
+        return data + current
+
+    def delete_smb_file(self, conn, share_name, filename):
+        """Delete a file from the share, a file that doesn't exist is not an error"""
+        try:
+            conn.deleteFiles(share_name, filename)
+        except SMBSessionPool.CONNECTION_ERRORS:
+            raise
+        except Exception:
+            if self.time_record_signature(conn, share_name, filename) is not None:
+                raise
+
+    def clean_stale_temp_files(self, conn, share_name):
+        """Finish or discard temp files left on the share by writes that were interrupted"""
+        self.temp_files_checked = True
+        try:
+            files = conn.listPath(share_name, '/', pattern=f'{self.TEMP_PREFIX}*')
+        except SMBSessionPool.CONNECTION_ERRORS:
+            raise
+        except Exception:
+            return
+        
+        # Younger temp files may belong to a write another client is still doing
+        cutoff = time.time() - self.STALE_TEMP_AGE
+        for f in files:
+            if f.isDirectory or f.last_write_time > cutoff:
+                continue
+            temp_filename = f.filename
+            filename = temp_filename[len(self.TEMP_PREFIX):]
+            try:
+                if self.time_record_signature(conn, share_name, filename) is None:
+                    # Interrupted after the original was deleted, the temp file holds the new content
+                    conn.rename(share_name, temp_filename, filename)
+                    print(f"Recovered {filename} from stale temp file")
+                else:
+                    conn.deleteFiles(share_name, temp_filename)
+                    print(f"Deleted stale temp file {temp_filename}")
+            except SMBSessionPool.CONNECTION_ERRORS:
+                raise
+            except Exception as e:
+                print(f"Could not clean up {temp_filename}: {str(e)}")
+
+    def _fetch_file_batch(self, filenames, file_done=None, is_cancelled=None):
+        """Download a batch of files over one pooled session, returns filename -> bytes"""
+        contents = {}
+        with self.smb_pool.connection() as (conn, share_name):
+            for filename in filenames:
+                if is_cancelled and is_cancelled():
+                    raise ReportCancelled()
                 try:
-                    # Read file content
                     file_obj = io.BytesIO()
-                    conn.retrieveFile(share_name, file, file_obj)
-                    file_obj.seek(0)
-                    
-                    # Convert to DataFrame with column names
-                    df = pd.read_csv(file_obj, names=['CardID', 'Timestamp', 'Status'])
-                    if not df.empty:
-                        # Parse timestamps - they might be in different formats
-                        # Try full datetime first, then just time format
-                        try:
-                            df['Timestamp'] = pd.to_datetime(df['Timestamp'], format='%Y-%m-%d %H:%M:%S', errors='coerce')
-                        except:
-                            # If that fails, try just time format (HH:MM:SS)
-                            df['Timestamp'] = pd.to_datetime(df['Timestamp'], format='%H:%M:%S', errors='coerce')
-                        print(f"Successfully read file {file} with {len(df)} rows")
-                        all_data.append(df)
+                    conn.retrieveFile(share_name, filename, file_obj)
+                    contents[filename] = file_obj.getvalue()
+                except SMBSessionPool.CONNECTION_ERRORS:
+                    raise
                 except Exception as e:
-                    print(f"Napaka pri branju datoteke {file}: {str(e)}")
+                    print(f"Napaka pri branju datoteke {filename}: {str(e)}")
+                if file_done:
+                    file_done()
+        return contents
+
+    def fetch_smb_files(self, filenames, progress=None, is_cancelled=None):
+        """Download files, spreading them over a bounded number of pooled SMB sessions
+        
+        progress(done, total) is called after every file, is_cancelled() is checked before every file."""
+        filenames = list(filenames)
+        
+        # Sessions finish files concurrently, so count them under a lock
+        done = [0]
+        done_lock = threading.Lock()
+        def file_done():
+            if progress:
+                with done_lock:
+                    done[0] += 1
+                    progress(done[0], len(filenames))
+        
+        workers = min(self.smb_pool.max_size, len(filenames))
+        if workers <= 1:
+            return self._fetch_file_batch(filenames, file_done, is_cancelled)
+        
+        # Round-robin split so every session gets a similar share of the days
+        batches = [filenames[i::workers] for i in range(workers)]
+        contents = {}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(self._fetch_file_batch, batch, file_done, is_cancelled) for batch in batches]
+            for future in futures:
+                contents.update(future.result())
+        return contents
+
+    def sync_records_cache(self, listing, start_name, end_name, progress=None, is_cancelled=None):
+        """Download the files of listing that changed since they were cached and store them in the cache
+        
+        Returns the names of the files that were already current and the freshly parsed records
+        (see parse_time_record_batch). Cached files between start_name and end_name that are no
+        longer on the share are dropped."""
+        # Days whose size and last write time did not change come from the local cache
+        cached_files = self.records_cache.valid_files(listing)
+        files = sorted(name for name in listing if name not in cached_files)
+        print(f"Found {len(listing)} time_records files, {len(cached_files)} cached, {len(files)} to download")
+        
+        contents = {}
+        current_month = datetime.now().strftime('%Y%m')
+        closed_months = {}
+        for file in files:
+            if file[13:19] < current_month:
+                closed_months.setdefault(file[13:19], []).append(file)
+        months = [month for month, names in closed_months.items() if len(names) >= self.ROLLUP_MIN_FILES]
+        if months:
+            contents.update(self.read_rollups(months, listing, is_cancelled))
+            files = [file for file in files if file not in contents]
+        contents.update(self.fetch_smb_files(files, progress, is_cancelled))
+        parsed = self.parse_time_record_batch(contents)
+        
+        # Remember the parsed rows so unchanged days are not downloaded again
+        groups = dict(tuple(parsed.groupby('File', sort=False)))
+        for file in contents:
+            df = groups.get(file, parsed.iloc[:0])
+            file_size, last_write_time = listing[file]
+            try:
+                self.records_cache.store(file, file_size, last_write_time, df)
+            except Exception as e:
+                print(f"Could not cache {file}: {str(e)}")
+        
+        # Files deleted from the share must not linger in the cache
+        self.records_cache.forget(self.records_cache.cached_filenames(start_name, end_name) - set(listing))
+        return cached_files, parsed
+
+    def parse_time_record_batch(self, contents):
+        """Parse many time_records files (filename -> bytes) with a single read_csv call
+        
+        Every line is tagged with its filename, so the result has File, CardID, Timestamp
+        and Status text columns in file order."""
+        if not contents:
+            return pd.DataFrame(columns=['File', 'CardID', 'Timestamp', 'Status'], dtype=object)
+        chunks = []
+        for filename, content in contents.items():
+            content = content.rstrip(b'\r\n')
+            if content.strip():
+                tag = filename.encode('utf-8') + b','
+                chunks.append(tag + content.replace(b'\n', b'\n' + tag) + b'\n')
+        if not chunks:
+            return pd.DataFrame(columns=['File', 'CardID', 'Timestamp', 'Status'], dtype=object)
+        
+        try:
+            df = pd.read_csv(
+                io.BytesIO(b''.join(chunks)),
+                names=['File', 'CardID', 'Timestamp', 'Status'],
+                dtype={'File': object, 'CardID': object, 'Timestamp': object, 'Status': object},
+            )
+        except Exception as e:
+            # One malformed file must not hide the others, parse them one by one
+            print(f"Batch parse failed, parsing files separately: {str(e)}")
+            frames = []
+            for filename, content in contents.items():
+                try:
+                    frames.append(self.parse_time_record_file(content).assign(File=filename))
+                except Exception as file_e:
+                    print(f"Napaka pri branju datoteke {filename}: {str(file_e)}")
+            frames = [frame for frame in frames if not frame.empty]
+            if not frames:
+                return pd.DataFrame(columns=['File', 'CardID', 'Timestamp', 'Status'], dtype=object)
+            df = pd.concat(frames, ignore_index=True)[['File', 'CardID', 'Timestamp', 'Status']]
+        # Blank lines inside a file turn into tag-only rows, read_csv would have skipped them
+        return df.dropna(subset=['CardID', 'Timestamp', 'Status'], how='all').reset_index(drop=True)
+
+    def empty_time_records(self):
+        """Records frame without rows, with the column types read_smb_files returns"""
+        return pd.DataFrame({
+            'CardID': pd.Series(dtype=object),
+            'Timestamp': pd.Series(dtype='datetime64[ns]'),
+            'Status': pd.Series(dtype=object),
+        })
+
+    def rollup_name(self, month):
+        """Name of the roll-up file of a month given as YYYYMM"""
+        return f"time_records_{month}.gz"
+
+    def read_rollups(self, months, listing, is_cancelled=None):
+        """Raw day files of closed months taken from their roll-ups, by filename
+        
+        Only days whose size and last write time in the roll-up match listing are returned,
+        the caller downloads the other days (and whole months without a valid roll-up) itself."""
+        with self.smb_pool.connection() as (conn, share_name):
+            available = {f.filename for f in conn.listPath(share_name, '/', pattern='time_records_*.gz')}
+        names = [self.rollup_name(month) for month in sorted(months) if self.rollup_name(month) in available]
+        
+        parsed = {}
+        for rollup, content in self.fetch_smb_files(names, is_cancelled=is_cancelled).items():
+            try:
+                data = gzip.decompress(content)
+                header, body = data.split(b'\n', 1)
+                header = json.loads(header)
+                if hashlib.sha256(body).hexdigest() != header['sha256']:
+                    print(f"Checksum of {rollup} doesn't match, reading daily files")
                     continue
-            
+                offset = 0
+                for filename, file_size, last_write_time, length in header['files']:
+                    if listing.get(filename) == (file_size, last_write_time):
+                        parsed[filename] = body[offset:offset + length]
+                    offset += length
+                print(f"Read {rollup}")
+            except Exception as e:
+                print(f"Napaka pri branju datoteke {rollup}: {str(e)}")
+        return parsed
+
+    def compact_closed_months(self):
+        """Write a roll-up for every closed month whose daily files changed after its roll-up was written
+        
+        Runs only while this client holds the roll-up lock on the share and stops between files
+        when compaction_stop is set, newest months first and at most ROLLUP_MONTHS_PER_RUN of them."""
+        try:
+            with self.smb_pool.connection() as (conn, share_name):
+                if not self.acquire_rollup_lock(conn, share_name):
+                    return
+                files = conn.listPath(share_name, '/', pattern='time_records_*')
+            try:
+                daily = {f.filename: (f.file_size, f.last_write_time) for f in files
+                         if not f.isDirectory and re.fullmatch(r'time_records_\d{8}\.csv', f.filename)}
+                rollups = {f.filename: f.last_write_time for f in files
+                           if not f.isDirectory and re.fullmatch(r'time_records_\d{6}\.gz', f.filename)}
+                
+                current_month = datetime.now().strftime('%Y%m')
+                months = {}
+                for name, meta in daily.items():
+                    if name[13:19] < current_month:
+                        months.setdefault(name[13:19], {})[name] = meta
+                
+                stale = [(month, month_listing) for month, month_listing in sorted(months.items(), reverse=True)
+                         if rollups.get(self.rollup_name(month)) is None
+                         or max(meta[1] for meta in month_listing.values()) > rollups[self.rollup_name(month)]]
+                for month, month_listing in stale[:self.ROLLUP_MONTHS_PER_RUN]:
+                    if self.compaction_stop.is_set():
+                        break
+                    self.write_rollup(month, month_listing)
+            finally:
+                with self.smb_pool.connection() as (conn, share_name):
+                    self.delete_smb_file(conn, share_name, self.ROLLUP_LOCK_FILE)
+        except ReportCancelled:
+            print("Compacting time records stopped")
+        except Exception as e:
+            print(f"Error compacting time records: {str(e)}")
+
+    def acquire_rollup_lock(self, conn, share_name):
+        """Take the roll-up lock file on the share, returns False while another client holds it"""
+        try:
+            attributes = conn.getAttributes(share_name, self.ROLLUP_LOCK_FILE)
+            if attributes.last_write_time > time.time() - self.ROLLUP_LOCK_AGE:
+                print("Another client is compacting time records")
+                return False
+        except SMBSessionPool.CONNECTION_ERRORS:
+            raise
+        except Exception:
+            pass
+        
+        owner = self.shared_journal.client_id.encode('utf-8')
+        conn.storeFile(share_name, self.ROLLUP_LOCK_FILE, io.BytesIO(owner))
+        # Two clients may have written the lock at the same moment, the one whose content stayed owns it
+        file_obj = io.BytesIO()
+        conn.retrieveFile(share_name, self.ROLLUP_LOCK_FILE, file_obj)
+        return file_obj.getvalue() == owner
+
+    def write_rollup(self, month, month_listing):
+        """Write the roll-up of a closed month from its daily files, returns whether it was written
+        
+        The roll-up is a gzip file with a JSON header line (name, size, last write time and length
+        of every day plus a sha256 of the rest) followed by the raw daily files back to back."""
+        names = sorted(month_listing)
+        contents = self.fetch_smb_files(names, is_cancelled=self.compaction_stop.is_set)
+        if set(contents) != set(names):
+            print(f"Could not read all files of {month}, roll-up skipped")
+            return False
+        
+        body = b''.join(contents[name] for name in names)
+        header = {
+            'month': month,
+            'sha256': hashlib.sha256(body).hexdigest(),
+            'files': [[name, *month_listing[name], len(contents[name])] for name in names],
+        }
+        data = gzip.compress(json.dumps(header).encode('utf-8') + b'\n' + body)
+        
+        with self.smb_pool.connection() as (conn, share_name):
+            # A day edited while the month was being read would be recorded with the wrong content
+            current = {name: meta for name, meta in self.list_time_record_files(conn, share_name).items()
+                       if name[13:19] == month}
+            if current != month_listing:
+                print(f"Files of {month} changed while compacting, roll-up skipped")
+                return False
+            self.write_smb_file(conn, share_name, self.rollup_name(month), data)
+        print(f"Wrote {self.rollup_name(month)} with {len(names)} days")
+        return True
+
+    def card_file_listing(self, card_id, start_date=None, end_date=None):
+        """Listing (filename -> (size, mtime)) of the day files that contain records of the card
+        
+        Uses the card index of the local cache, so only files that changed since they were
+        cached are downloaded. Without dates the whole share is searched."""
+        start_name = f"time_records_{start_date.strftime('%Y%m%d')}.csv" if start_date else "time_records_"
+        end_name = f"time_records_{end_date.strftime('%Y%m%d')}.csv" if end_date else "time_records_99999999.csv"
+        with self.smb_pool.connection() as (conn, share_name):
+            listing = {name: meta for name, meta in self.list_time_record_files(conn, share_name).items()
+                       if start_name <= name <= end_name}
+        cached_files, parsed = self.sync_records_cache(listing, start_name, end_name)
+        files = self.records_cache.files_with_cards([card_id], cached_files)
+        files.update(parsed.loc[parsed['CardID'] == card_id, 'File'])
+        return {name: listing[name] for name in sorted(files)}
+
+    def read_smb_files(self, start_date, end_date, progress=None, is_cancelled=None, card_ids=None):
+        """Read CSV files from SMB share for the given date range
+        
+        With card_ids only records of those cards are returned and only the cached files
+        that contain them are loaded."""
+        try:
+            all_data = []
+            start_name = f"time_records_{start_date.strftime('%Y%m%d')}.csv"
+            end_name = f"time_records_{end_date.strftime('%Y%m%d')}.csv"
+            with self.smb_pool.connection() as (conn, share_name):
+                # One directory listing instead of a blind fetch for every day
+                existing_files = self.list_time_record_files(conn, share_name)
+            listing = {name: meta for name, meta in existing_files.items() if start_name <= name <= end_name}
+            print(f"Reading time_records files between {start_date} and {end_date}")
+            
+            cached_files, parsed = self.sync_records_cache(listing, start_name, end_name, progress, is_cancelled)
+            if card_ids is not None:
+                cached_files = self.records_cache.files_with_cards(card_ids, cached_files)
+            
+            if card_ids is not None:
+                parsed = parsed[parsed['CardID'].isin(card_ids)]
+            all_data.append(parsed)
+            
+            if cached_files:
+                all_data.append(self.records_cache.load(cached_files, card_ids))
+            
+            all_data = [df for df in all_data if not df.empty]
             if not all_data:
                 # Return empty DataFrame instead of raising error
                 # This allows the WorktimeEditDialog to open even when no files exist
-                return pd.DataFrame(columns=['CardID', 'Timestamp', 'Status'])
+                return self.empty_time_records()
             
+            # Restore day order (the sort is stable, so rows keep their order within a file)
             combined_data = pd.concat(all_data, ignore_index=True)
+            combined_data = combined_data.sort_values('File', kind='stable').drop(columns='File').reset_index(drop=True)
+            
+            # Timestamps are parsed once here, callers get a datetime64 column and don't convert it again
+            combined_data['Timestamp'] = pd.to_datetime(combined_data['Timestamp'], format='%Y-%m-%d %H:%M:%S', errors='coerce')
             print(f"Combined data shape: {combined_data.shape}")
             return combined_data
             
+        except ReportCancelled:
+            raise
         except Exception as e:
             print(f"Error in read_smb_files: {str(e)}")
             # Don't show critical error dialog for missing files - just return empty DataFrame
             # This allows the WorktimeEditDialog to open even when SMB connection fails
-            return pd.DataFrame(columns=['CardID', 'Timestamp', 'Status'])
-        finally:
-            if 'conn' in locals():
-                conn.close()
+            return self.empty_time_records()
 
     def update_worker_id_file(self):
         """Update the worker_id.csv file in the SMB share with current employee data"""
         try:
-            # Get settings from config file
-            config = configparser.ConfigParser()
-            if not os.path.exists('config.ini'):
-                raise ValueError("Nastavitve niso bile najdene. Najprej nastavite SMB povezavo.")
-            
-            config.read('config.ini')
-            if 'SMB' not in config:
-                raise ValueError("Nastavitve SMB niso bile najdene. Najprej nastavite SMB povezavo.")
-            
-            smb_path = config['SMB'].get('path', '')
-            if not smb_path.startswith('\\'):
-                raise ValueError("Neveljavna SMB pot")
-            
-            server_name = smb_path.split('\\')[2]
-            share_name = smb_path.split('\\')[3]
-            
-            # Get authentication settings
-            username = config['SMB'].get('username', '')
-            password = config['SMB'].get('password', '')
-            
-            # Connect to SMB share
-            conn = SMBConnection(username, password, "CLIENT", server_name, use_ntlm_v2=True)
-            connected = conn.connect(server_name, 445)
-            
-            if not connected:
-                raise ConnectionError("Ni mogoče vzpostaviti povezave s strežnikom")
-            
             # Get all employees (remove S.P. logic)
             self.cursor.execute("SELECT name, card_id FROM employees ORDER BY name")
             employees = self.cursor.fetchall()
@@ -3381,89 +4338,34 @@ class MainWindow(QMainWindow):
             csv_content = "\n".join(lines)
             
             # Save to SMB share
-            file_obj = io.BytesIO(csv_content.encode('utf-8'))
-            conn.storeFile(share_name, "worker_id.csv", file_obj)
+            with self.smb_pool.connection() as (conn, share_name):
+                self.write_smb_file(conn, share_name, "worker_id.csv", csv_content.encode('utf-8'))
             
             print("Successfully updated worker_id.csv file")
             
         except Exception as e:
             QMessageBox.critical(self, "Napaka", f"Napaka pri posodabljanju datoteke worker_id.csv: {str(e)}")
             print(f"Error in update_worker_id_file: {str(e)}")
-        finally:
-            if 'conn' in locals():
-                conn.close()
 
     def update_card_id_in_time_records(self, old_card_id, new_card_id):
-        """Update card ID in all time_records CSV files"""
+        """Update card ID in the time_records CSV files that contain it"""
         try:
-            # Get settings from config file
-            config = configparser.ConfigParser()
-            if not os.path.exists('config.ini'):
-                raise ValueError("Nastavitve niso bile najdene. Najprej nastavite SMB povezavo.")
-            
-            config.read('config.ini')
-            if 'SMB' not in config:
-                raise ValueError("Nastavitve SMB niso bile najdene. Najprej nastavite SMB povezavo.")
-            
-            smb_path = config['SMB'].get('path', '')
-            if not smb_path.startswith('\\\\'):
-                raise ValueError("Neveljavna SMB pot")
-            
-            server_name = smb_path.split('\\')[2]
-            share_name = smb_path.split('\\')[3]
-            
-            # Get authentication settings
-            username = config['SMB'].get('username', '')
-            password = config['SMB'].get('password', '')
-            
-            # Connect to SMB share
-            conn = SMBConnection(username, password, "CLIENT", server_name, use_ntlm_v2=True)
-            connected = conn.connect(server_name, 445)
-            
-            if not connected:
-                raise ConnectionError("Ni mogoče vzpostaviti povezave s strežnikom")
-            
-            # Get list of all time_records files
-            try:
-                files = conn.listPath(share_name, '/')
-                time_record_files = [f.filename for f in files if f.filename.startswith('time_records_') and f.filename.endswith('.csv')]
-            except Exception as e:
-                print(f"Error listing files: {str(e)}")
-                time_record_files = []
-            
-            updated_files = 0
-            for filename in time_record_files:
-                try:
-                    # Read file content
-                    file_obj = io.BytesIO()
-                    conn.retrieveFile(share_name, filename, file_obj)
-                    file_obj.seek(0)
-                    
-                    # Read CSV content
-                    content = file_obj.read().decode('utf-8')
-                    
-                    # Replace old card ID with new one
-                    if old_card_id in content:
-                        content = content.replace(old_card_id, new_card_id)
-                        
-                        # Write back to file
-                        file_obj = io.BytesIO(content.encode('utf-8'))
-                        conn.storeFile(share_name, filename, file_obj)
-                        updated_files += 1
-                        print(f"Updated {filename}")
-                    
-                except Exception as e:
-                    print(f"Error updating {filename}: {str(e)}")
-                    continue
+            # Only the CardID column is compared and changed, other fields are kept as they are
+            listing = self.card_file_listing(old_card_id)
+            results = self.rewrite_time_record_files(
+                listing, lambda df: df.assign(CardID=df['CardID'].mask(df['CardID'] == old_card_id, new_card_id)))
             
+            updated_files = sum(1 for r in results.values() if r['action'] == 'updated')
+            failed = sorted(name for name, r in results.items() if r['action'] == 'failed')
             print(f"Successfully updated {updated_files} time_records files")
+            if failed:
+                raise Exception(f"Kartica ni bila zamenjana v datotekah: {', '.join(failed)}")
             
         except Exception as e:
             QMessageBox.critical(self, "Napaka", f"Napaka pri posodabljanju time_records datotek: {str(e)}")
             print(f"Error in update_card_id_in_time_records: {str(e)}")
         finally:
-            if 'conn' in locals():
-                conn.close()
+            self.month_records.invalidate()
 
     def change_worker_card_id(self, old_card_id, new_card_id, worker_name):
         """Change worker's card ID in database and all related files"""
@@ -3491,10 +4393,136 @@ class MainWindow(QMainWindow):
             QMessageBox.critical(self, "Napaka", f"Napaka pri spreminjanju ID-ja kartice: {str(e)}")
             print(f"Error in change_worker_card_id: {str(e)}")
 
-    def calculate_working_hours(self, card_id, start_date, end_date):
-        """Calculate working hours for a specific card ID in the given date range"""
+    def build_working_hours(self, card_data, daily_hours, special_days):
+        """Pair arrivals with departures and summarize each day using column operations"""
+        is_flexible = daily_hours == -1
+        
+        # Sort by timestamp, days without a valid timestamp are skipped
+        records = card_data[card_data['Timestamp'].notna()].sort_values('Timestamp', kind='stable')
+        record_days = records['Timestamp'].dt.normalize().to_numpy()
+        days = np.unique(record_days)
+        
+        # Only arrivals and departures take part in pairing
+        events = records['Status'].isin(['Prihod na delo', 'Izhod iz dela']).to_numpy()
+        ev_time = records['Timestamp'].to_numpy()[events]
+        ev_day = record_days[events]
+        ev_arrival = (records['Status'] == 'Prihod na delo').to_numpy()[events]
+        
+        # A repeated arrival while at work and a repeated departure while away are ignored,
+        # so keep only the first event of every run of equal statuses within a day
+        same_day = np.zeros(len(ev_day), dtype=bool)
+        same_day[1:] = ev_day[1:] == ev_day[:-1]
+        repeated = np.zeros(len(ev_day), dtype=bool)
+        repeated[1:] = ev_arrival[1:] == ev_arrival[:-1]
+        keep = ~(same_day & repeated)
+        ev_time, ev_day, ev_arrival = ev_time[keep], ev_day[keep], ev_arrival[keep]
+        
+        # A departure that opens the day has no arrival to pair with
+        same_day = np.zeros(len(ev_day), dtype=bool)
+        same_day[1:] = ev_day[1:] == ev_day[:-1]
+        keep = same_day | ev_arrival
+        ev_time, ev_day, ev_arrival = ev_time[keep], ev_day[keep], ev_arrival[keep]
+        
+        # Events now alternate arrival/departure, every departure closes the preceding arrival
+        departures = np.flatnonzero(~ev_arrival)
+        pair_hours = (ev_time[departures] - ev_time[departures - 1]) / np.timedelta64(1, 's') / 3600
+        pair_day = np.searchsorted(days, ev_day[departures])
+        
+        # Sum the pairs of each day in chronological order, one pair position at a time
+        has_pairs = np.zeros(len(days), dtype=bool)
+        has_pairs[pair_day] = True
+        totals = np.zeros(len(days))
+        if len(departures):
+            pair_position = pd.Series(pair_day).groupby(pair_day).cumcount().to_numpy()
+            pair_matrix = np.zeros((len(days), pair_position.max() + 1))
+            pair_matrix[pair_day, pair_position] = pair_hours
+            for position in range(pair_matrix.shape[1]):
+                totals = totals + pair_matrix[:, position]
+        
+        # First arrival and last departure of each day
+        arrival_times = pd.Series(ev_time[ev_arrival]).groupby(np.searchsorted(days, ev_day[ev_arrival])).first()
+        exit_times = pd.Series(ev_time[departures]).groupby(pair_day).last()
+        first_entry = pd.Series('', index=range(len(days)), dtype=object)
+        last_exit = pd.Series('', index=range(len(days)), dtype=object)
+        first_entry[arrival_times.index] = arrival_times.dt.strftime('%H:%M:%S').to_numpy()
+        last_exit[exit_times.index] = exit_times.dt.strftime('%H:%M:%S').to_numpy()
+        
+        # Days without a pair keep an integer zero, like the hours of special days
+        day_dates = pd.DatetimeIndex(days).date
+        special = np.array([date in special_days for date in day_dates], dtype=bool)
+        total_hours = [total if paired and not is_special else 0
+                       for total, paired, is_special in zip(totals.tolist(), has_pairs, special)]
+        
+        # Classify the day
+        totals = np.where(has_pairs & ~special, totals, 0.0)
+        kind = np.select(
+            [special, totals == 0, np.full(len(days), is_flexible), totals > daily_hours, totals == daily_hours],
+            ['special', 'incomplete', 'flexible', 'overtime', 'normal'],
+            'shortage'
+        )
+        status = pd.Series(kind).map({
+            'incomplete': 'Nepopolni podatki',
+            'flexible': 'Gibljivi delovni čas',
+            'normal': 'Normalno',
+        }).to_numpy(dtype=object)
+        for i in np.flatnonzero(kind == 'special'):
+            status[i] = special_days[day_dates[i]]
+        for i in np.flatnonzero(kind == 'overtime'):
+            status[i] = f'Nadure ({round(total_hours[i] - daily_hours, 2)} ur)'
+        for i in np.flatnonzero(kind == 'shortage'):
+            status[i] = f'Manjko ur ({round(daily_hours - total_hours[i], 2)} ur)'
+        
+        # Add special days that don't have any records
+        recorded_days = set(day_dates)
+        extra_days = [date for date in special_days if date not in recorded_days]
+        
+        result_df = pd.DataFrame({
+            'Datum': list(day_dates) + extra_days,
+            'Prihod na delo': first_entry.tolist() + [''] * len(extra_days),
+            'Izhod iz dela': last_exit.tolist() + [''] * len(extra_days),
+            'Delovne ure': [round(hours, 2) for hours in total_hours] + [0] * len(extra_days),
+            'Status': status.tolist() + [special_days[date] for date in extra_days]
+        })
+        if result_df.empty:
+            return result_df
+            
+        # Sort by date and ensure proper chronological order
+        result_df['Datum'] = pd.to_datetime(result_df['Datum'])
+        result_df = result_df.sort_values('Datum')
+        result_df['Datum'] = result_df['Datum'].dt.date
+        return result_df
+
+    def get_month_records(self, year, month):
+        """Time records of all cards for one month, read once and shared through month_records"""
+        first_day = datetime(year, month, 1).date()
+        last_day = (first_day + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        return self.month_records.get((year, month), lambda: self.read_smb_files(first_day, last_day))
+
+    def prefetch_months(self, months):
+        """Load the given (year, month) keys into month_records on a background thread"""
+        today = datetime.now().date()
+        months = [key for key in months
+                  if key <= (today.year, today.month) and self.month_records.needs_load(key)]
+        if not months:
+            return
+        
+        def prefetch():
+            for year, month in months:
+                try:
+                    self.get_month_records(year, month)
+                    print(f"Prefetched time records for {month}/{year}")
+                except Exception as e:
+                    print(f"Error prefetching {month}/{year}: {str(e)}")
+        
+        threading.Thread(target=prefetch, daemon=True).start()
+
+    def calculate_working_hours(self, card_id, start_date, end_date, data=None):
+        """Calculate working hours for a specific card ID in the given date range
+        
+        data can hold records that were already read for the range (e.g. from month_records)."""
         try:
-            data = self.read_smb_files(start_date, end_date)
+            if data is None:
+                data = self.read_smb_files(start_date, end_date, card_ids=[card_id])
             if data is None:
                 return None
             
@@ -3512,102 +4540,14 @@ class MainWindow(QMainWindow):
             # Get employee's daily hours
             self.cursor.execute("SELECT daily_hours FROM employees WHERE card_id = ?", (card_id,))
             daily_hours = self.cursor.fetchone()[0]
-            is_flexible = daily_hours == -1
             
             # Get special days for the date range
-            self.cursor.execute("""
-                SELECT date, type 
-                FROM special_days 
-                WHERE card_id = ? 
-                AND date BETWEEN ? AND ?
-            """, (card_id, start_date, end_date))
-            special_days = {}
-            for row in self.cursor.fetchall():
-                date = row[0]
-                if isinstance(date, str):
-                    date = datetime.strptime(date, '%Y-%m-%d').date()
-                # Translate special day types to Slovenian
-                day_type = row[1]
-                if day_type == 'vacation':
-                    day_type = 'Dopust'
-                elif day_type == 'sick_leave':
-                    day_type = 'Bolniški stalež'
-                special_days[date] = day_type
-            
-            # Convert timestamp to datetime
-            card_data['Timestamp'] = pd.to_datetime(card_data['Timestamp'])
-            
-            # Group by date and calculate hours
-            daily_hours_list = []
-            for date, group in card_data.groupby(card_data['Timestamp'].dt.date):
-                # Sort by timestamp
-                group = group.sort_values('Timestamp')
-                
-                # Initialize variables for this day
-                total_hours = 0
-                current_entry = None
-                first_entry = None
-                last_exit = None
-                
-                # Process each record
-                for _, row in group.iterrows():
-                    if row['Status'] == 'Prihod na delo':
-                        if current_entry is None:  # Only set if not already in work
-                            current_entry = row['Timestamp']
-                            if first_entry is None:  # Store first entry of the day
-                                first_entry = row['Timestamp']
-                    elif row['Status'] == 'Izhod iz dela':
-                        if current_entry is not None:  # Only calculate if there was an entry
-                            hours = (row['Timestamp'] - current_entry).total_seconds() / 3600
-                            total_hours += hours
-                            current_entry = None
-                            last_exit = row['Timestamp']  # Update last exit time
-                
-                # Check if this is a special day
-                if date in special_days:
-                    status = special_days[date]
-                    total_hours = 0  # Special days are counted as non-working days
-                else:
-                    # Determine status for normal days
-                    if total_hours == 0:
-                        status = 'Nepopolni podatki'
-                    elif is_flexible:
-                        status = 'Gibljivi delovni čas'
-                    elif total_hours > daily_hours:
-                        status = f'Nadure ({round(total_hours - daily_hours, 2)} ur)'
-                    elif total_hours == daily_hours:
-                        status = 'Normalno'
-                    else:
-                        status = f'Manjko ur ({round(daily_hours - total_hours, 2)} ur)'
-                
-                daily_hours_list.append({
-                    'Datum': date,
-                    'Prihod na delo': first_entry.strftime('%H:%M:%S') if first_entry else '',
-                    'Izhod iz dela': last_exit.strftime('%H:%M:%S') if last_exit else '',
-                    'Delovne ure': round(total_hours, 2),
-                    'Status': status
-                })
-            
-            # Add special days that don't have any records
-            for date, day_type in special_days.items():
-                if date not in [d['Datum'] for d in daily_hours_list]:
-                    daily_hours_list.append({
-                        'Datum': date,
-                        'Prihod na delo': '',
-                        'Izhod iz dela': '',
-                        'Delovne ure': 0,
-                        'Status': day_type
-                    })
-            
-            result_df = pd.DataFrame(daily_hours_list)
+            special_days = self.load_special_days([card_id], start_date, end_date)[0][card_id]
+            
+            result_df = self.build_working_hours(card_data, daily_hours, special_days)
             if result_df.empty:
                 QMessageBox.warning(self, "Opozorilo", "Ni podatkov za izračun.")
                 return None
-                
-            # Sort by date and ensure proper chronological order
-            result_df['Datum'] = pd.to_datetime(result_df['Datum'])
-            result_df = result_df.sort_values('Datum')
-            result_df['Datum'] = result_df['Datum'].dt.date
             return result_df
             
         except Exception as e:
@@ -3617,16 +4557,208 @@ class MainWindow(QMainWindow):
             print(traceback.format_exc())
             return None
 
+    def load_special_days(self, card_ids, start_date, end_date):
+        """Fetch special days of several employees in one query, returns days and per-type counts by card ID"""
+        special_days = {card_id: {} for card_id in card_ids}
+        special_counts = {card_id: {} for card_id in card_ids}
+        if not card_ids:
+            return special_days, special_counts
+        placeholders = ','.join('?' * len(card_ids))
+        self.cursor.execute(f"""
+            SELECT card_id, date, type 
+            FROM special_days 
+            WHERE card_id IN ({placeholders}) 
+            AND date BETWEEN ? AND ?
+        """, (*card_ids, start_date, end_date))
+        for card_id, date, day_type in self.cursor.fetchall():
+            if isinstance(date, str):
+                date = datetime.strptime(date, '%Y-%m-%d').date()
+            counts = special_counts[card_id]
+            counts[day_type] = counts.get(day_type, 0) + 1
+            # Translate special day types to Slovenian
+            if day_type == 'vacation':
+                day_type = 'Dopust'
+            elif day_type == 'sick_leave':
+                day_type = 'Bolniški stalež'
+            special_days[card_id][date] = day_type
+        return special_days, special_counts
+
+    def calculate_working_hours_batch(self, employees, start_date, end_date, special_days, special_counts,
+                                      include_overtime=False, include_shortage=False, progress=None, is_cancelled=None):
+        """Calculate working hours for several employees from a single read of the date range
+        
+        Does not touch the database, so it can run on a ReportWorker; special days come from
+        load_special_days. Returns a dict of daily results by card ID (None when there is
+        nothing to show) and the summary rows used by the group calculation."""
+        card_ids = [card_id for card_id, _, _ in employees]
+        
+        def files_progress(done, total):
+            if progress:
+                progress(done, total, f"Prenašanje datotek ({done}/{total})...")
+        
+        data = self.read_smb_files(start_date, end_date, files_progress, is_cancelled, card_ids)
+        partitions = {card_id: group for card_id, group in data.groupby('CardID', sort=False)}
+        
+        results = {}
+        summary_rows = []
+        for index, (card_id, name, daily_hours) in enumerate(employees):
+            if is_cancelled and is_cancelled():
+                raise ReportCancelled()
+            if progress:
+                progress(index, len(employees), f"Obdelava zaposlenih ({index + 1}/{len(employees)})...")
+            card_data = partitions.get(card_id)
+            if card_data is None:
+                # Don't count an employee without records unless the range reaches into the future
+                if end_date > datetime.now().date():
+                    result = pd.DataFrame(columns=['Datum', 'Prihod na delo', 'Izhod iz dela', 'Delovne ure', 'Status'])
+                else:
+                    result = None
+            else:
+                result = self.build_working_hours(card_data, daily_hours, special_days[card_id])
+                if result.empty:
+                    result = None
+            results[card_id] = result
+            if result is not None:
+                summary_rows.append(self.build_group_summary_row(
+                    card_id, name, daily_hours, result, special_counts[card_id],
+                    include_overtime, include_shortage
+                ))
+        return results, summary_rows
+
+    def build_group_summary_row(self, card_id, name, daily_hours, result, special_counts, include_overtime, include_shortage):
+        """Summarize the daily results of one employee for the group calculation"""
+        # Calculate summary statistics
+        total_days = len(result)
+        total_hours = result['Delovne ure'].sum()
+        
+        # Count days with different statuses
+        shortage_days = len(result[result['Status'].str.startswith('Manjko ur')])
+        overtime_days = len(result[result['Status'].str.startswith('Nadure')])
+        
+        sick_leave_days = special_counts.get('sick_leave', 0)
+        vacation_days = special_counts.get('vacation', 0)
+        
+        # Calculate overtime and shortage hours if requested
+        overtime_hours = 0
+        shortage_hours = 0
+        
+        if include_overtime:
+            overtime_hours = result[result['Status'].str.startswith('Nadure')]['Delovne ure'].sum() - (daily_hours * overtime_days)
+        
+        if include_shortage:
+            shortage_hours = (daily_hours * shortage_days) - result[result['Status'].str.startswith('Manjko ur')]['Delovne ure'].sum()
+        
+        # Calculate net hours (Skupaj) if at least one is requested
+        net_hours = None
+        if include_overtime or include_shortage:
+            net_hours = round(overtime_hours - shortage_hours, 2)
+        
+        # Create summary row
+        summary_row = {
+            'Številka kartice': card_id,
+            'Ime delavca': name,
+            'Dnevni delovni čas': 'Gibljiv' if daily_hours == -1 else str(daily_hours),
+            'Skupno delovnih dni': total_days,
+            'Skupno delovnih ur': round(total_hours, 2),
+            'Dnevi z manjko ur': shortage_days,
+            'Dnevi z nadurami': overtime_days,
+            'Bolniški stalež - št. dni': sick_leave_days,
+            'Dopust - št. dni': vacation_days
+        }
+        
+        # Add optional columns if requested
+        if include_overtime:
+            summary_row['Nadure'] = round(overtime_hours, 2)
+        
+        if include_shortage:
+            summary_row['Manjko ur'] = round(shortage_hours, 2)
+        
+        if net_hours is not None:
+            summary_row['Neto ur'] = net_hours
+        
+        return summary_row
+
+    def run_report(self, employees, start_date, end_date, on_finished, include_overtime=False, include_shortage=False):
+        """Calculate working hours on a ReportWorker while a cancellable progress dialog is shown
+        
+        on_finished(results, summary_rows) is called on the main thread when the calculation completes."""
+        if self.report_worker and self.report_worker.isRunning():
+            QMessageBox.information(self, "Opozorilo", "Izračun že poteka. Počakajte, da se zaključi.")
+            return
+        
+        # Database reads stay on the main thread, the worker only reads SMB and calculates
+        card_ids = [card_id for card_id, _, _ in employees]
+        special_days, special_counts = self.load_special_days(card_ids, start_date, end_date)
+        
+        def task(progress, is_cancelled):
+            return self.calculate_working_hours_batch(
+                employees, start_date, end_date, special_days, special_counts,
+                include_overtime=include_overtime, include_shortage=include_shortage,
+                progress=progress, is_cancelled=is_cancelled
+            )
+        
+        progress_dialog = QProgressDialog("Pridobivanje podatkov...", "Prekliči", 0, 0, self)
+        progress_dialog.setWindowTitle("Izračun")
+        progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        progress_dialog.setAutoClose(False)
+        progress_dialog.setAutoReset(False)
+        progress_dialog.setMinimumDuration(0)
+        
+        def on_progress(done, total, text):
+            progress_dialog.setLabelText(text)
+            progress_dialog.setMaximum(total)
+            progress_dialog.setValue(done)
+        
+        def on_ready(result):
+            progress_dialog.close()
+            try:
+                on_finished(*result)
+            except Exception as e:
+                QMessageBox.critical(self, "Napaka", f"Napaka pri izračunu: {str(e)}")
+                print(f"Error in report result handler: {str(e)}")
+        
+        def on_failed(message):
+            progress_dialog.close()
+            QMessageBox.critical(self, "Napaka", f"Napaka pri izračunu delovnih ur: {message}")
+        
+        def on_done():
+            progress_dialog.close()
+            if self.report_worker is worker:
+                self.report_worker = None
+            worker.deleteLater()
+
+        worker = ReportWorker(task, self)
+        worker.progress.connect(on_progress)
+        worker.report_ready.connect(on_ready)
+        worker.report_failed.connect(on_failed)
+        worker.finished.connect(on_done)
+        progress_dialog.canceled.connect(worker.stop)
+        self.report_worker = worker
+        worker.start()
+        progress_dialog.show()
+
+    def run_employee_report(self, card_id, start_date, end_date, on_result):
+        """Calculate working hours of one employee in the background and pass the daily results to on_result"""
+        self.cursor.execute("SELECT card_id, name, daily_hours FROM employees WHERE card_id = ?", (card_id,))
+        employee = self.cursor.fetchone()
+        if employee is None:
+            QMessageBox.warning(self, "Opozorilo", "Delavec ne obstaja.")
+            return
+        
+        def on_finished(results, summary_rows):
+            result = results.get(card_id)
+            if result is None:
+                QMessageBox.warning(self, "Opozorilo", "Ni podatkov za izbranega delavca v tem obdobju.")
+                return
+            on_result(result)
+        
+        self.run_report([employee], start_date, end_date, on_finished)
+
     def search_employee_by_name(self):
-        """Highlight/select all rows where the worker's name contains the search text (case-insensitive)"""
-        search_text = self.name_search_box.text().strip().lower()
-        if not search_text:
+        """Select the rows left by the filter, which follows the search box as the user types"""
+        if not self.name_search_box.text().strip():
             return
-        self.employee_table.clearSelection()
-        for row in range(self.employee_table.rowCount()):
-            name_item = self.employee_table.item(row, 0)
-            if name_item and search_text in name_item.text().lower():
-                self.employee_table.selectRow(row)
+        self.employee_table.selectAll()
 
     def archive_worker_data(self, card_id, worker_name):
         """Archive worker data by collecting timestamps from SMB CSV files"""
@@ -3657,15 +4789,8 @@ class MainWindow(QMainWindow):
             # Collect timestamps for the worker
             QMessageBox.information(self, "Arhiviranje", "Začnem z arhiviranjem podatkov...")
             
-            # Read SMB files for the date range
-            all_data = self.read_smb_files(start_date, end_date)
-            
-            if all_data.empty:
-                QMessageBox.warning(self, "Napaka", "Ni podatkov za izbrano obdobje.")
-                return
-            
-            # Filter data for the specific worker
-            worker_data = all_data[all_data['CardID'] == card_id].copy()
+            # Read the worker's records for the date range
+            worker_data = self.read_smb_files(start_date, end_date, card_ids=[card_id])
             
             if worker_data.empty:
                 QMessageBox.warning(self, "Napaka", f"Ni podatkov za delavca {worker_name} v izbranem obdobju.")
@@ -3721,23 +4846,13 @@ class MainWindow(QMainWindow):
             if reply != QMessageBox.StandardButton.Yes:
                 return
             
-            # Read SMB files for the date range
-            all_data = self.read_smb_files(start_date, end_date)
-            
-            if all_data.empty:
-                QMessageBox.warning(self, "Napaka", "Ni podatkov za izbrano obdobje.")
-                return
-            
-            # Filter data for the specific worker
-            worker_data = all_data[all_data['CardID'] == card_id].copy()
+            # Delete timestamps from SMB files
+            deleted_count = self.delete_timestamps_from_smb(card_id, start_date, end_date)
             
-            if worker_data.empty:
+            if deleted_count == 0:
                 QMessageBox.warning(self, "Napaka", f"Ni podatkov za delavca {worker_name} v izbranem obdobju.")
                 return
             
-            # Delete timestamps from SMB files
-            deleted_count = self.delete_timestamps_from_smb(card_id, start_date, end_date)
-            
             QMessageBox.information(
                 self, 
                 "Uspešno brisanje", 
@@ -3751,411 +4866,545 @@ class MainWindow(QMainWindow):
             print(traceback.format_exc())
 
     def delete_timestamps_from_smb(self, card_id, start_date, end_date):
-        """Delete timestamps for specific worker from SMB CSV files using the same method as individual deletion"""
+        """Delete timestamps for specific worker from SMB CSV files, returns the number of deleted records"""
+        print(f"Starting SMB deletion for card_id: {card_id}, period: {start_date} to {end_date}")
+        listing = self.card_file_listing(card_id, start_date, end_date)
+        results = self.rewrite_time_record_files(listing, lambda df: df[df['CardID'].astype(str) != str(card_id)])
+        
+        records_deleted = sum(r['before'] - r['after'] for r in results.values() if r['action'] in ('updated', 'deleted'))
+        files_processed = sum(1 for r in results.values() if r['action'] in ('updated', 'deleted'))
+        failed = sorted(name for name, r in results.items() if r['action'] == 'failed')
+        print(f"SMB deletion completed. Files processed: {files_processed}, Records deleted: {records_deleted}")
+        if failed:
+            raise Exception(f"Evidence niso bile izbrisane iz datotek: {', '.join(failed)} "
+                            f"(ostalih {records_deleted} zapisov je bilo izbrisanih)")
+        return records_deleted
+
+    def parse_time_record_file(self, content):
+        """Parse the content of a time_records file into CardID, Timestamp and Status text columns"""
+        if not content.strip():
+            return pd.DataFrame(columns=['CardID', 'Timestamp', 'Status'])
+        return pd.read_csv(io.BytesIO(content), names=['CardID', 'Timestamp', 'Status'], dtype=object)
+
+    def time_record_signature(self, conn, share_name, filename):
+        """Size and last write time of a file on the share, None when it doesn't exist"""
         try:
-            print(f"Starting SMB deletion for card_id: {card_id}, period: {start_date} to {end_date}")
-            
-            # Process each day in the date range
-            current_date = start_date
-            files_processed = 0
-            records_deleted = 0
-            
-            while current_date <= end_date:
-                print(f"Processing date: {current_date}")
-                
-                try:
-                    # Use the same method as individual deletion - read the data first
-                    df = self.read_smb_files(current_date, current_date)
-                    
-                    if df is not None and not df.empty:
-                        print(f"Loaded {len(df)} records for {current_date}")
-                        print(f"DataFrame columns: {df.columns.tolist()}")
-                        
-                        if 'CardID' in df.columns:
-                            # Check what CardID values exist
-                            unique_card_ids = df['CardID'].unique()
-                            print(f"Unique CardIDs in file: {unique_card_ids}")
-                            print(f"Looking for card_id: {card_id} (type: {type(card_id)})")
-                            
-                            # Filter out the worker's records
-                            original_count = len(df)
-                            df_filtered = df[df['CardID'].astype(str) != str(card_id)]
-                            new_count = len(df_filtered)
-                            deleted_count = original_count - new_count
-                            
-                            print(f"Original records: {original_count}, After filtering: {new_count}, Deleted: {deleted_count}")
-                            
-                            if deleted_count > 0:
-                                # Use the same update method as individual deletion
-                                if not df_filtered.empty:
-                                    print(f"Updating CSV file with remaining entries...")
-                                    self.update_csv_file_for_date(df_filtered, current_date)
-                                else:
-                                    print(f"No entries left, deleting CSV file...")
-                                    self.delete_csv_file_for_date(current_date)
-                                
-                                files_processed += 1
-                                records_deleted += deleted_count
-                                print(f"Successfully processed {current_date}: removed {deleted_count} records")
-                            else:
-                                print(f"No records found for card_id {card_id} on {current_date}")
-                        else:
-                            print(f"File for {current_date} is missing CardID column")
-                    else:
-                        print(f"No data found for {current_date}")
-                
-                except Exception as e:
-                    print(f"Error processing {current_date}: {str(e)}")
-                    import traceback
-                    print(traceback.format_exc())
-                    # Continue with other dates even if one fails
-                
-                current_date += timedelta(days=1)
-            
-            print(f"SMB deletion completed. Files processed: {files_processed}, Records deleted: {records_deleted}")
-            return records_deleted
-            
-        except Exception as e:
-            print(f"Error in delete_timestamps_from_smb: {str(e)}")
-            import traceback
-            print(traceback.format_exc())
+            attributes = conn.getAttributes(share_name, filename)
+            return attributes.file_size, attributes.last_write_time
+        except SMBSessionPool.CONNECTION_ERRORS:
             raise
+        except Exception:
+            return None
 
-    def update_csv_file_for_date(self, df, date):
-        """Update CSV file for specific date using the same method as individual deletion"""
+    def append_time_record(self, date, card_id, timestamp, status):
+        """Append one record at the current end of the day file with a single offset write
+        
+        The terminal can append a punch at the same offset at the same moment, so the written range
+        (with the line ending before it) is read back and the record written again at the new end
+        when it doesn't match."""
+        filename = f"time_records_{date.strftime('%Y%m%d')}.csv"
+        line = f"{card_id},{timestamp},{status}"
         try:
-            import configparser
-            import io
-            import tempfile
-            import os
-            from smb.SMBConnection import SMBConnection
-            
-            print(f"Updating CSV file for date: {date}")
-            print(f"DataFrame shape: {df.shape}")
-            
-            # Load configuration
-            config = configparser.ConfigParser()
-            config.read('config.ini')
-            
-            if 'SMB' not in config:
-                raise ValueError("Nastavitve SMB niso bile najdene.")
-            
-            smb_path = config['SMB'].get('path', '')
-            if not smb_path.startswith('\\\\'):
-                raise ValueError("Neveljavna SMB pot")
-            
-            # Parse SMB path more safely
-            path_parts = smb_path.split('\\')
-            if len(path_parts) < 4:
-                raise ValueError("Neveljavna SMB pot - manjkajo deli poti")
-            
-            server_name = path_parts[2]
-            share_name = path_parts[3]
-            username = config['SMB'].get('username', '')
-            password = config['SMB'].get('password', '')
-            
-            # Connect to SMB share
-            conn = SMBConnection(username, password, "CLIENT", server_name, use_ntlm_v2=True)
-            connected = conn.connect(server_name, 445)
-            
-            if not connected:
-                raise ConnectionError(f"Ni mogoče vzpostaviti povezave s strežnikom {server_name}")
-            
-            # Create CSV content (same format as individual deletion)
-            csv_content = df.to_csv(index=False, header=False)
-            
-            # Save to SMB share
-            filename = f"time_records_{date.strftime('%Y%m%d')}.csv"
-            
-            # Try multiple approaches to handle permission issues (same as individual deletion)
-            success = False
-            
-            # Method 1: Direct file storage
-            try:
-                file_obj = io.BytesIO(csv_content.encode('utf-8'))
-                conn.storeFile(share_name, filename, file_obj)
-                print("File saved successfully using direct method!")
-                success = True
-            except Exception as e:
-                print(f"Direct method failed: {str(e)}")
-            
-            # Method 2: Try deleting existing file first, then create new one
-            if not success:
-                try:
-                    print("Trying to delete existing file first...")
-                    try:
-                        conn.deleteFiles(share_name, filename)
-                        print("Existing file deleted successfully")
-                    except:
-                        print("No existing file to delete or deletion failed")
+            with self.smb_pool.connection() as (conn, share_name):
+                for attempt in range(self.APPEND_ATTEMPTS):
+                    signature = self.time_record_signature(conn, share_name, filename)
+                    size = signature[0] if signature else 0
+                    # Keep the file's line endings and start a new line if the last one isn't terminated
+                    tail = b''
+                    if size:
+                        tail_obj = io.BytesIO()
+                        conn.retrieveFileFromOffset(share_name, filename, tail_obj, max(size - 2, 0), 2)
+                        tail = tail_obj.getvalue()
+                    newline = '\r\n' if tail.endswith(b'\r\n') else '\n'
+                    prefix = '' if not tail or tail.endswith(b'\n') else newline
+                    data = f"{prefix}{line}{newline}".encode('utf-8')
+                    # Opens the file or creates it, an existing file is never truncated
+                    conn.storeFileFromOffset(share_name, filename, io.BytesIO(data), offset=size)
                     
-                    # Now try to create new file
-                    file_obj = io.BytesIO(csv_content.encode('utf-8'))
-                    conn.storeFile(share_name, filename, file_obj)
-                    print("File saved successfully using delete-first method!")
-                    success = True
-                except Exception as e:
-                    print(f"Delete-first method failed: {str(e)}")
+                    written = io.BytesIO()
+                    conn.retrieveFileFromOffset(share_name, filename, written, size - len(tail), len(tail) + len(data))
+                    if written.getvalue() == tail + data:
+                        break
+                    print(f"{filename} changed while the record was appended, writing it again")
+                else:
+                    raise Exception(f"Zapisa ni bilo mogoče dodati v datoteko {filename}, ker se je hkrati spreminjala")
+        finally:
+            self.month_records.invalidate((date.year, date.month))
+        print(f"Appended record to {filename}: {line}")
+
+    def rewrite_time_record_file(self, date, transform, max_attempts=3):
+        """Rewrite a day file with transform(df), returns the new rows or None when the file doesn't exist
+        
+        The file's size and last write time are compared again before writing. When the terminal
+        added records in the meantime, the file is read again and transform applied to the new content."""
+        filename = f"time_records_{date.strftime('%Y%m%d')}.csv"
+        for attempt in range(max_attempts):
+            with self.smb_pool.connection() as (conn, share_name):
+                signature = self.time_record_signature(conn, share_name, filename)
+                if signature is None:
+                    return None
+                file_obj = io.BytesIO()
+                conn.retrieveFile(share_name, filename, file_obj)
+                df = self.parse_time_record_file(file_obj.getvalue())
+                new_df = transform(df)
+                if len(new_df) == len(df) and new_df.reset_index(drop=True).equals(df):
+                    return new_df
+                if self.time_record_signature(conn, share_name, filename) != signature:
+                    print(f"{filename} changed while it was being edited, reading it again")
+                    continue
             
-            # Method 3: Try with temporary filename
-            if not success:
+            if new_df.empty:
+                self.delete_csv_file_for_date(date)
+            else:
                 try:
-                    temp_filename = f"temp_{filename}"
-                    print(f"Trying with temporary filename: {temp_filename}")
-                    
-                    file_obj = io.BytesIO(csv_content.encode('utf-8'))
-                    conn.storeFile(share_name, temp_filename, file_obj)
-                    print("Temporary file created successfully")
-                    
-                    # Try to delete original and rename temp
-                    try:
-                        conn.deleteFiles(share_name, filename)
-                    except:
-                        pass  # Ignore if original doesn't exist
-                    
-                    # Note: SMB doesn't have a direct rename, so we'll keep the temp file
-                    # and try to delete it, then create the final file
+                    self.update_csv_file_for_date(new_df, date, expected=signature)
+                except SMBWriteConflict:
+                    print(f"{filename} changed while it was being written, reading it again")
+                    continue
+            return new_df
+        raise Exception(f"Datoteka {filename} se je med urejanjem večkrat spremenila, poskusite znova.")
+
+    def rewrite_time_records(self, start_date, end_date, transform):
+        """Apply transform(df) to every day file in the range in one pass, returns filename -> result
+        
+        The range is listed once and the files are downloaded and written back in parallel over
+        pooled sessions. Only files that transform changed are written, files left without rows
+        are deleted. Each result is a dict with 'before' and 'after' row counts, 'action'
+        ('unchanged', 'updated', 'deleted' or 'failed') and 'error'."""
+        start_name = f"time_records_{start_date.strftime('%Y%m%d')}.csv"
+        end_name = f"time_records_{end_date.strftime('%Y%m%d')}.csv"
+        with self.smb_pool.connection() as (conn, share_name):
+            listing = {name: meta for name, meta in self.list_time_record_files(conn, share_name).items()
+                       if start_name <= name <= end_name}
+        return self.rewrite_time_record_files(listing, transform)
+
+    def rewrite_time_record_files(self, listing, transform):
+        """Apply transform(df) to the files of listing (filename -> (size, mtime)), see rewrite_time_records"""
+        filenames = sorted(listing)
+        contents = self.fetch_smb_files(filenames)
+        
+        results = {}
+        for filename in filenames:
+            if filename not in contents:
+                results[filename] = {'before': None, 'after': None, 'action': 'failed', 'error': "Branje ni uspelo"}
+        items = [(name, contents[name], listing[name]) for name in filenames if name in contents]
+        
+        workers = min(self.smb_pool.max_size, len(items))
+        batches = [items[i::workers] for i in range(workers)] if workers else []
+        try:
+            with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+                futures = [(executor.submit(self._rewrite_file_batch, batch, transform, results), batch) for batch in batches]
+                for future, batch in futures:
                     try:
-                        temp_file_obj = io.BytesIO()
-                        conn.retrieveFile(share_name, temp_filename, temp_file_obj)
-                        temp_file_obj.seek(0)
-                        
-                        final_file_obj = io.BytesIO(temp_file_obj.read())
-                        conn.storeFile(share_name, filename, final_file_obj)
-                        conn.deleteFiles(share_name, temp_filename)
-                        print("File saved successfully using temporary file method!")
-                        success = True
-                    except Exception as rename_e:
-                        # Keep the temp file as fallback
-                        print(f"Rename failed, keeping temporary file: {rename_e}")
-                        success = True  # Consider this a success since temp file exists
+                        future.result()
+                    except Exception as e:
+                        print(f"Rewrite batch failed: {str(e)}")
+                        for name, content, signature in batch:
+                            results.setdefault(name, {'before': None, 'after': None, 'action': 'failed', 'error': str(e)})
+        finally:
+            # Cached months of changed days must be read again, once the writes are done
+            for name, result in list(results.items()):
+                if result['action'] != 'unchanged':
+                    self.month_records.invalidate((int(name[13:17]), int(name[17:19])))
+        return results
+
+    def _rewrite_file_batch(self, items, transform, results):
+        """Rewrite a batch of downloaded files over one pooled session, filling results as files finish"""
+        with self.smb_pool.connection() as (conn, share_name):
+            for filename, content, signature in items:
+                try:
+                    results[filename] = self._rewrite_fetched_file(conn, share_name, filename, content, signature, transform)
+                except SMBSessionPool.CONNECTION_ERRORS:
+                    raise
                 except Exception as e:
-                    print(f"Temporary file method failed: {str(e)}")
-            
-            conn.close()
-            
-            if not success:
+                    print(f"Error rewriting {filename}: {str(e)}")
+                    results[filename] = {'before': None, 'after': None, 'action': 'failed', 'error': str(e)}
+
+    def _rewrite_fetched_file(self, conn, share_name, filename, content, signature, transform, max_attempts=3):
+        """Apply transform to a downloaded file and write it back if it changed
+        
+        If the file changed on the share since it was listed, it is downloaded again and
+        transform is applied to the new content, so records added in the meantime are kept."""
+        for attempt in range(max_attempts):
+            df = self.parse_time_record_file(content)
+            new_df = transform(df)
+            result = {'before': len(df), 'after': len(new_df), 'action': 'unchanged', 'error': None}
+            if len(new_df) == len(df) and new_df.reset_index(drop=True).equals(df):
+                return result
+            
+            current = self.time_record_signature(conn, share_name, filename)
+            if current != signature:
+                print(f"{filename} changed while it was being edited, reading it again")
+                if current is None:
+                    return result
+                file_obj = io.BytesIO()
+                conn.retrieveFile(share_name, filename, file_obj)
+                content, signature = file_obj.getvalue(), current
+                continue
+            
+            if new_df.empty:
+                self.delete_smb_file(conn, share_name, filename)
+                result['action'] = 'deleted'
+            else:
+                try:
+                    self.write_smb_file(conn, share_name, filename, new_df.to_csv(index=False, header=False).encode('utf-8'),
+                                        expected=signature, merge=self.merge_time_records)
+                except SMBWriteConflict:
+                    print(f"{filename} changed while it was being written, reading it again")
+                    signature = self.time_record_signature(conn, share_name, filename)
+                    if signature is None:
+                        return result
+                    file_obj = io.BytesIO()
+                    conn.retrieveFile(share_name, filename, file_obj)
+                    content = file_obj.getvalue()
+                    continue
+                result['action'] = 'updated'
+            print(f"Rewrote {filename}: {result['before']} -> {result['after']} rows")
+            return result
+        raise Exception(f"Datoteka {filename} se je med urejanjem večkrat spremenila")
+
+    def update_csv_file_for_date(self, df, date, expected=None):
+        """Replace the CSV file for specific date on the SMB share
+        
+        With expected (size, last write time) SMBWriteConflict is raised when the file changed since it was read."""
+        filename = f"time_records_{date.strftime('%Y%m%d')}.csv"
+        print(f"Updating CSV file for date: {date}")
+        print(f"DataFrame shape: {df.shape}")
+        csv_content = df.to_csv(index=False, header=False)
+        try:
+            with self.smb_pool.connection() as (conn, share_name):
+                self.write_smb_file(conn, share_name, filename, csv_content.encode('utf-8'),
+                                    expected=expected, merge=self.merge_time_records)
+            print(f"File {filename} saved successfully")
+        except SMBWriteConflict:
+            raise
+        except Exception as e:
+            print(f"Error in update_csv_file_for_date: {str(e)}")
+            # Check if this is a permission error
+            if "0xC0000022" in str(e) or "ACCESS_DENIED" in str(e).upper() or "Unable to open file" in str(e):
                 # Try to save locally as backup
                 try:
-                    local_filename = f"backup_{filename}"
-                    df.to_csv(local_filename, index=False, header=False)
-                    raise Exception(f"NAPAKA DOVOLJENJ: Aplikacija nima dovoljenja za pisanje v SMB mapo. Podatki so bili shranjeni lokalno kot varnostna kopija v {local_filename}. Prosimo kontaktirajte sistemskega administratorja za nastavitev ustreznih dovoljenj.")
+                    backup_dir = "backup_csv"
+                    os.makedirs(backup_dir, exist_ok=True)
+                    local_filename = os.path.join(backup_dir, filename)
+                    with open(local_filename, 'w', encoding='utf-8') as f:
+                        f.write(csv_content)
+                    print(f"Data saved locally as backup: {local_filename}")
                 except Exception as backup_e:
                     print(f"Backup save also failed: {backup_e}")
-                    raise Exception(f"NAPAKA DOVOLJENJ: Aplikacija nima dovoljenja za pisanje v SMB mapo. Varnostna kopija ni mogla biti shranjena. Prosimo kontaktirajte sistemskega administratorja za nastavitev ustreznih dovoljenj.")
-                
-        except Exception as e:
-            print(f"Error in update_csv_file_for_date: {str(e)}")
-            raise
+                    raise Exception(f"NAPAKA DOVOLJENJ: Aplikacija nima dovoljenja za pisanje v SMB mapo. Varnostna kopija ni mogla biti shranjena. Prosimo kontaktirajte sistemskega administratorja za nastavitev ustreznih dovoljenj. Tehnični opis: {str(e)}")
+                raise Exception(f"NAPAKA DOVOLJENJ: Aplikacija nima dovoljenja za pisanje v SMB mapo. Podatki so bili shranjeni lokalno kot varnostna kopija v {local_filename}. Prosimo kontaktirajte sistemskega administratorja za nastavitev ustreznih dovoljenj. Tehnični opis: {str(e)}")
+            raise Exception(f"Napaka pri posodabljanju CSV datoteke: {str(e)}")
+        finally:
+            self.month_records.invalidate((date.year, date.month))
 
     def delete_csv_file_for_date(self, date):
         """Delete CSV file for specific date using the same method as individual deletion"""
         try:
-            import configparser
-            from smb.SMBConnection import SMBConnection
-            
-            # Load configuration
-            config = configparser.ConfigParser()
-            config.read('config.ini')
-            
-            if 'SMB' not in config:
-                raise ValueError("Nastavitve SMB niso bile najdene.")
-            
-            smb_path = config['SMB'].get('path', '')
-            if not smb_path.startswith('\\\\'):
-                raise ValueError("Neveljavna SMB pot")
-            
-            # Parse SMB path more safely
-            path_parts = smb_path.split('\\')
-            if len(path_parts) < 4:
-                raise ValueError("Neveljavna SMB pot - manjkajo deli poti")
-            
-            server_name = path_parts[2]
-            share_name = path_parts[3]
-            username = config['SMB'].get('username', '')
-            password = config['SMB'].get('password', '')
-            
-            # Connect to SMB share
-            conn = SMBConnection(username, password, "CLIENT", server_name, use_ntlm_v2=True)
-            connected = conn.connect(server_name, 445)
-            
-            if not connected:
-                raise ConnectionError(f"Ni mogoče vzpostaviti povezave s strežnikom {server_name}")
-            
-            # Delete the file
-            filename = f"time_records_{date.strftime('%Y%m%d')}.csv"
-            try:
-                conn.deleteFiles(share_name, filename)
-                print(f"File {filename} deleted successfully")
-            except Exception as e:
-                print(f"Could not delete file {filename}: {str(e)}")
-                # This is not necessarily an error - file might not exist
-            finally:
-                conn.close()
+            with self.smb_pool.connection() as (conn, share_name):
+                # Delete the file
+                filename = f"time_records_{date.strftime('%Y%m%d')}.csv"
+                try:
+                    conn.deleteFiles(share_name, filename)
+                    print(f"File {filename} deleted successfully")
+                except Exception as e:
+                    print(f"Could not delete file {filename}: {str(e)}")
+                    # This is not necessarily an error - file might not exist
                 
         except Exception as e:
             print(f"Error in delete_csv_file_for_date: {str(e)}")
             raise
+        finally:
+            self.month_records.invalidate((date.year, date.month))
 
-    def get_smb_connection(self):
-        """Get SMB connection with error handling"""
-        try:
-            config = configparser.ConfigParser()
-            if not os.path.exists('config.ini'):
-                return None, None
-            
-            config.read('config.ini')
-            if 'SMB' not in config:
-                return None, None
-            
-            smb_path = config['SMB'].get('path', '')
-            if not smb_path.startswith('\\\\'):
-                return None, None
-            
-            server_name = smb_path.split('\\')[2]
-            share_name = smb_path.split('\\')[3]
-            username = config['SMB'].get('username', '')
-            password = config['SMB'].get('password', '')
-            
-            conn = SMBConnection(username, password, "CLIENT", server_name, use_ntlm_v2=True)
-            connected = conn.connect(server_name, 445)
-            
-            if connected:
-                return conn, share_name
-            else:
-                return None, None
-                
-        except Exception as e:
-            print(f"Error creating SMB connection: {str(e)}")
-            return None, None
+    def read_shared_files_signature(self):
+        """Last write time and size of the sync files, read over a pooled session without downloading them"""
+        journal = self.shared_journal
+        signature = []
+        with self.smb_pool.connection() as (conn, share_name):
+            for path in (journal.VERSION_FILE, journal.JOURNAL_FILE):
+                try:
+                    attributes = conn.getAttributes(share_name, path)
+                    signature.append((attributes.last_write_time, attributes.file_size))
+                except SMBSessionPool.CONNECTION_ERRORS:
+                    raise
+                except Exception:
+                    signature.append(None)
+        return tuple(signature)
 
     def get_data_version(self):
         """Get current data version for conflict detection"""
         try:
-            conn, share_name = self.get_smb_connection()
-            if not conn:
-                return 1
-            
-            file_obj = io.BytesIO()
-            try:
-                conn.retrieveFile(share_name, "data_version.txt", file_obj)
-                file_obj.seek(0)
-                version = int(file_obj.read().decode('utf-8').strip())
-            except:
-                version = 1
+            with self.smb_pool.connection() as (conn, share_name):
+                file_obj = io.BytesIO()
+                try:
+                    conn.retrieveFile(share_name, "data_version.txt", file_obj)
+                    file_obj.seek(0)
+                    version = int(file_obj.read().decode('utf-8').strip())
+                except SMBSessionPool.CONNECTION_ERRORS:
+                    raise
+                except:
+                    version = 1
             
-            conn.close()
             return version
             
         except Exception as e:
             print(f"Error getting data version: {str(e)}")
             return 1
 
-    def save_shared_data_to_smb(self):
-        """Save all shared data to SMB share in JSON format"""
-        try:
-            conn, share_name = self.get_smb_connection()
-            if not conn:
-                print("No SMB connection available")
-                return False
-            
-            # Get all data from local database
-            self.cursor.execute("SELECT * FROM employees")
-            employees = [dict(zip([col[0] for col in self.cursor.description], row)) 
-                        for row in self.cursor.fetchall()]
-            
-            self.cursor.execute("SELECT * FROM groups")
-            groups = [dict(zip([col[0] for col in self.cursor.description], row)) 
-                     for row in self.cursor.fetchall()]
-            
-            self.cursor.execute("SELECT * FROM special_days")
-            special_days = [dict(zip([col[0] for col in self.cursor.description], row)) 
-                           for row in self.cursor.fetchall()]
-            
-            # Create shared data structure
-            shared_data = {
-                "employees": employees,
-                "groups": groups,
-                "special_days": special_days,
+    def read_shared_tables(self):
+        """Read the synchronized tables as {table: {id: row}}"""
+        tables = {}
+        for table, columns in self.SHARED_TABLES.items():
+            self.cursor.execute(f"SELECT {', '.join(columns)} FROM {table}")
+            tables[table] = {row[0]: row for row in self.cursor.fetchall()}
+        return tables
+
+    def shared_key(self, table, row):
+        """Natural key of a row (in SHARED_TABLES column order) as a list"""
+        columns = self.SHARED_TABLES[table]
+        return [row[columns.index(column)] for column in self.SHARED_KEYS[table]]
+
+    def shared_row(self, table, row, tables):
+        """Row as it is written to the journal: without the local id and with the group named instead of its id"""
+        values = dict(zip(self.SHARED_TABLES[table], row))
+        del values['id']
+        if table == 'employees':
+            group = tables['groups'].get(values.pop('group_id'))
+            values['group'] = group[1] if group else None
+        return values
+
+    def diff_shared_tables(self, old_tables, new_tables):
+        """Operations that turn old_tables into new_tables, rows are named by their SHARED_KEYS"""
+        ops = []
+        for table in self.SHARED_TABLES:
+            old_rows = old_tables.get(table, {})
+            for row_id, row in new_tables[table].items():
+                old_row = old_rows.get(row_id)
+                if old_row != row:
+                    op = {"table": table, "op": "upsert", "key": self.shared_key(table, row),
+                          "row": self.shared_row(table, row, new_tables)}
+                    if old_row is not None and self.shared_key(table, old_row) != op["key"]:
+                        # A renamed group or changed card ID updates the row on other PCs instead of adding one
+                        op["previous"] = self.shared_key(table, old_row)
+                    ops.append(op)
+        # Delete dependent rows first
+        for table in reversed(list(self.SHARED_TABLES)):
+            old_rows = old_tables.get(table, {})
+            for row_id in old_rows.keys() - new_tables[table].keys():
+                ops.append({"table": table, "op": "delete", "key": self.shared_key(table, old_rows[row_id])})
+        return ops
+
+    def prepare_shared_changes(self):
+        """Read the local tables and the operations since the last sync, returns (tables, ops)"""
+        tables = self.read_shared_tables()
+        return tables, self.diff_shared_tables(self.synced_state, tables)
+
+    def upload_shared_changes(self, tables, ops):
+        """Append operations to the shared change journal, returns (version, up_to_date); no database access"""
+        journal = self.shared_journal
+        with self.smb_pool.connection() as (conn, share_name):
+            remote_version = journal.read_version(conn, share_name)
+            
+            entry = {
+                "client": journal.client_id,
                 "last_updated": datetime.now().isoformat(),
-                "version": self.data_version + 1
+                "ops": ops
             }
-            
-            # Save to SMB as JSON
-            json_data = json.dumps(shared_data, ensure_ascii=False, indent=2)
-            file_obj = io.BytesIO(json_data.encode('utf-8'))
-            conn.storeFile(share_name, "shared_data.json", file_obj)
-            
-            # Update version file
-            version_data = str(shared_data["version"])
-            version_obj = io.BytesIO(version_data.encode('utf-8'))
-            conn.storeFile(share_name, "data_version.txt", version_obj)
-            
-            # Update local version
-            self.data_version = shared_data["version"]
-            
-            conn.close()
-            print(f"Successfully saved shared data (version {self.data_version})")
+            # The version is given by the entry's place in the journal
+            version, journal_size, up_to_date = journal.append(
+                conn, share_name, entry, max(remote_version, self.data_version))
+            
+            # Update version file, an older version written by a slower client is not put back
+            if journal.read_version(conn, share_name) < version:
+                version_obj = io.BytesIO(str(version).encode('utf-8'))
+                conn.storeFile(share_name, journal.VERSION_FILE, version_obj)
+            
+            # Fold a long journal into the snapshot, only when no other client's changes are pending
+            if up_to_date and journal_size > journal.COMPACT_SIZE:
+                snapshot = {
+                    table: [dict(zip(columns, row)) for row in tables[table].values()]
+                    for table, columns in self.SHARED_TABLES.items()
+                }
+                snapshot["last_updated"] = entry["last_updated"]
+                # The version at the end of the folded journal, every later entry has a higher one
+                snapshot["version"] = journal.base_version() + journal_size
+                if journal.compact(conn, share_name, snapshot, journal_size):
+                    print(f"Compacted shared data journal into snapshot (version {snapshot['version']})")
+        return version, up_to_date
+
+    def finish_shared_upload(self, tables, ops, version, up_to_date):
+        """Mark uploaded operations as synced and update the local version"""
+        # Operations name rows by key, find the local ids they came from
+        uploaded_ids = {table: {tuple(self.shared_key(table, row)): row_id for row_id, row in tables[table].items()}
+                        for table in self.SHARED_TABLES}
+        synced_ids = {table: {tuple(self.shared_key(table, row)): row_id for row_id, row in rows.items()}
+                      for table, rows in self.synced_state.items()}
+        for op in ops:
+            table = op["table"]
+            if op["op"] == "upsert":
+                row_id = uploaded_ids[table][tuple(op["key"])]
+                self.synced_state[table][row_id] = tables[table][row_id]
+            else:
+                self.synced_state[table].pop(synced_ids[table].get(tuple(op["key"])), None)
+        
+        # Update local version
+        self.data_version = max(self.data_version, version)
+        if up_to_date:
+            self.last_known_version = max(self.last_known_version, version)
+        print(f"Successfully saved {len(ops)} shared data changes (version {version})")
+
+    def save_shared_data_to_smb(self):
+        """Append the changes since the last sync to the shared change journal (blocking)"""
+        try:
+            # Get all data from local database and compare it with the last synced state
+            tables, ops = self.prepare_shared_changes()
+            if not ops:
+                print("No shared data changes to save")
+                return True
+            
+            version, up_to_date = self.upload_shared_changes(tables, ops)
+            self.finish_shared_upload(tables, ops, version, up_to_date)
             return True
             
         except Exception as e:
             print(f"Error saving shared data: {str(e)}")
             return False
 
-    def load_shared_data_from_smb(self):
-        """Load all shared data from SMB share"""
+    def fetch_shared_changes(self):
+        """Download shared data changes that are not applied yet, without touching the database"""
+        with self.smb_pool.connection() as (conn, share_name):
+            return self.shared_journal.read_changes(conn, share_name)
+
+    def apply_shared_changes(self, payload):
+        """Apply a payload from fetch_shared_changes to the local database in one transaction"""
         try:
-            conn, share_name = self.get_smb_connection()
-            if not conn:
-                print("No SMB connection available for loading shared data")
-                return False
-            
-            # Load shared data
-            file_obj = io.BytesIO()
-            try:
-                conn.retrieveFile(share_name, "shared_data.json", file_obj)
-                file_obj.seek(0)
-                shared_data = json.loads(file_obj.read().decode('utf-8'))
-            except:
-                print("No shared data file found, using local data only")
-                conn.close()
-                return False
-            
-            # Clear local database
-            self.cursor.execute("DELETE FROM special_days")
-            self.cursor.execute("DELETE FROM employees")
-            self.cursor.execute("DELETE FROM groups")
-            
-            # Insert groups first (due to foreign key constraints)
-            for group in shared_data.get("groups", []):
-                self.cursor.execute("""
-                    INSERT OR REPLACE INTO groups (id, name) VALUES (?, ?)
-                """, (group["id"], group["name"]))
-            
-            # Insert employees
-            for employee in shared_data.get("employees", []):
-                self.cursor.execute("""
-                    INSERT OR REPLACE INTO employees (id, name, card_id, daily_hours, group_id) 
-                    VALUES (?, ?, ?, ?, ?)
-                """, (employee["id"], employee["name"], employee["card_id"], 
-                      employee["daily_hours"], employee["group_id"]))
+            snapshot = payload["snapshot"]
+            if snapshot is not None:
+                # Clear local database
+                self.cursor.execute("DELETE FROM special_days")
+                self.cursor.execute("DELETE FROM employees")
+                self.cursor.execute("DELETE FROM groups")
+                
+                # Insert groups first (due to foreign key constraints)
+                for table, columns in self.SHARED_TABLES.items():
+                    self.cursor.executemany(f"""
+                        INSERT OR REPLACE INTO {table} ({', '.join(columns)}) 
+                        VALUES ({', '.join('?' * len(columns))})
+                    """, [tuple(row[column] for column in columns) for row in snapshot.get(table, [])])
             
-            # Insert special days
-            for special_day in shared_data.get("special_days", []):
-                self.cursor.execute("""
-                    INSERT OR REPLACE INTO special_days (id, card_id, date, type) 
-                    VALUES (?, ?, ?, ?)
-                """, (special_day["id"], special_day["card_id"], 
-                      special_day["date"], special_day["type"]))
+            changed_rows = set()
+            for entry in payload["entries"]:
+                changed_rows |= self.apply_shared_ops(entry.get("ops", []))
             
             self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        if snapshot is not None:
+            self.shared_journal.snapshot_loaded = True
+        
+        # Remember what is now in sync with the share, without marking local edits as synced
+        if snapshot is not None:
+            self.synced_state = self.read_shared_tables()
+        else:
+            for table, row_id in changed_rows:
+                columns = self.SHARED_TABLES[table]
+                self.cursor.execute(f"SELECT {', '.join(columns)} FROM {table} WHERE id = ?", (row_id,))
+                row = self.cursor.fetchone()
+                if row is None:
+                    self.synced_state[table].pop(row_id, None)
+                else:
+                    self.synced_state[table][row_id] = row
+        
+        self.shared_journal.header = payload["header"]
+        self.shared_journal.offset = payload["offset"]
+        
+        # Update local version
+        versions = [entry.get("version", 0) for entry in payload["entries"]]
+        if snapshot is not None:
+            versions.append(snapshot.get("version", 1))
+        if versions:
+            self.data_version = max(self.data_version, *versions)
+            self.last_known_version = max(self.last_known_version, *versions)
+        return snapshot is not None or bool(payload["entries"])
+
+    def find_shared_row(self, table, key):
+        """Local id of the row with the given SHARED_KEYS values, None when there is none"""
+        conditions = ' AND '.join(f"{column} = ?" for column in self.SHARED_KEYS[table])
+        self.cursor.execute(f"SELECT id FROM {table} WHERE {conditions}", tuple(key))
+        row = self.cursor.fetchone()
+        return row[0] if row else None
+
+    def apply_shared_ops(self, ops):
+        """Apply journal operations to the database (no commit), returns the (table, local id) pairs they changed"""
+        changed_rows = set()
+        for op in ops:
+            table = op["table"]
+            if table not in self.SHARED_TABLES:
+                continue
+            columns = self.SHARED_TABLES[table]
+            
+            if "key" not in op:
+                # Written by an older version, rows are named by id
+                if op["op"] == "upsert":
+                    self.cursor.execute(f"""
+                        INSERT OR REPLACE INTO {table} ({', '.join(columns)}) 
+                        VALUES ({', '.join('?' * len(columns))})
+                    """, tuple(op["row"][column] for column in columns))
+                    changed_rows.add((table, op["row"]["id"]))
+                elif op["op"] == "delete":
+                    self.cursor.execute(f"DELETE FROM {table} WHERE id = ?", (op["id"],))
+                    changed_rows.add((table, op["id"]))
+                continue
+            
+            row_id = self.find_shared_row(table, op["key"])
+            if op["op"] == "delete":
+                if row_id is not None:
+                    self.cursor.execute(f"DELETE FROM {table} WHERE id = ?", (row_id,))
+                    changed_rows.add((table, row_id))
+                continue
+            
+            values = dict(op["row"])
+            if table == 'employees':
+                group = values.pop('group', None)
+                values['group_id'] = self.find_shared_row('groups', [group]) if group is not None else None
+            if "previous" in op:
+                previous_id = self.find_shared_row(table, op["previous"])
+                if previous_id is not None:
+                    if row_id is not None and row_id != previous_id:
+                        # Both rows exist here, the renamed row takes over the key
+                        self.cursor.execute(f"DELETE FROM {table} WHERE id = ?", (row_id,))
+                        changed_rows.add((table, row_id))
+                    row_id = previous_id
+            
+            data_columns = [column for column in columns if column != 'id']
+            row_values = tuple(values[column] for column in data_columns)
+            if row_id is None:
+                self.cursor.execute(f"""
+                    INSERT INTO {table} ({', '.join(data_columns)}) 
+                    VALUES ({', '.join('?' * len(data_columns))})
+                """, row_values)
+                row_id = self.cursor.lastrowid
+            else:
+                self.cursor.execute(f"""
+                    UPDATE {table} SET {', '.join(f"{column} = ?" for column in data_columns)} WHERE id = ?
+                """, (*row_values, row_id))
+            changed_rows.add((table, row_id))
+        return changed_rows
+
+    def load_shared_data_from_smb(self):
+        """Load shared data changes from SMB share"""
+        try:
+            payload = self.fetch_shared_changes()
+            if payload is None:
+                print("No shared data file found, using local data only")
+                return False
             
-            # Update local version
-            self.data_version = shared_data.get("version", 1)
-            self.last_known_version = self.data_version
+            self.apply_shared_changes(payload)
             
-            conn.close()
-            print(f"Successfully loaded shared data (version {self.data_version})")
+            print(f"Successfully loaded shared data (version {self.data_version}, "
+                  f"{len(payload['entries'])} journal entries{', full snapshot' if payload['snapshot'] else ''})")
             return True
             
         except Exception as e:
@@ -4186,38 +5435,136 @@ class MainWindow(QMainWindow):
             print(f"Error starting update check: {str(e)}")
             self.update_in_progress = False
     
-    def handle_update_available(self, version):
-        """Handle when an update has been loaded (runs on main thread)"""
+    def showEvent(self, event):
+        """Record the first paint of the window"""
+        super().showEvent(event)
+        if 'first_paint' not in self.startup_timings:
+            # Runs once the event loop has processed the pending paint events
+            QTimer.singleShot(0, lambda: self.record_startup_phase('first_paint'))
+
+    def record_startup_phase(self, phase):
+        """Remember and log how long after creating the window a startup phase was reached"""
+        if phase not in self.startup_timings:
+            self.startup_timings[phase] = (time.perf_counter() - self.startup_started) * 1000
+            print(f"Startup: {phase} after {self.startup_timings[phase]:.0f} ms")
+
+    def handle_update_available(self, version, payload, signature):
+        """Apply changes downloaded by the update worker (runs on main thread)"""
         try:
-            # Data has already been loaded by the worker thread
-            # Just update the UI elements
-            print(f"Main thread: Updating UI for version {version}")
-            self.update_employee_table()
-            self.update_groups_list()
-            print(f"Main thread: UI update completed for version {version}")
+            if payload is not None and self.first_sync_pending:
+                # Edits made before the share's data arrived are applied again on top of it instead of being lost
+                local_ops = self.diff_shared_tables(self.synced_state, self.read_shared_tables())
+                print(f"Main thread: Applying version {version}")
+                self.apply_shared_changes(payload)
+                if local_ops:
+                    try:
+                        self.apply_shared_ops(local_ops)
+                        self.conn.commit()
+                    except Exception:
+                        self.conn.rollback()
+                        raise
+                    self.save_shared_data_with_retry()
+                self.update_employee_table()
+                self.update_groups_list()
+                self.shared_files_signature = signature
+                self.finish_first_sync(signature)
+                return
+            if payload is not None and (self.sync_timer.isActive() or
+                                        (self.save_worker and self.save_worker.isRunning())):
+                # A snapshot would overwrite local changes that aren't uploaded yet, apply on the next check
+                print(f"Local changes pending, postponing version {version}")
+                return
+            if payload is None:
+                # Nothing to apply, just update the known version
+                self.last_known_version = max(self.last_known_version, version)
+            else:
+                print(f"Main thread: Applying version {version}")
+                if self.apply_shared_changes(payload):
+                    self.update_employee_table()
+                    self.update_groups_list()
+                print(f"Main thread: UI update completed for version {version}")
+            self.shared_files_signature = signature
+            if self.first_sync_pending:
+                self.finish_first_sync(signature)
         except Exception as e:
-            print(f"Error updating UI after data load: {str(e)}")
+            print(f"Error applying shared data update: {str(e)}")
+
+    def finish_first_sync(self, signature):
+        """Record the startup sync once the shared data was applied or found up to date"""
+        self.first_sync_pending = False
+        if all(part is None for part in signature):
+            # Neither the version file nor the journal exists yet, seed the share with the local database
+            print("No shared data on the share, uploading the local database")
+            self.synced_state = {table: {} for table in self.SHARED_TABLES}
+            self.save_shared_data_with_retry()
+        self.record_startup_phase('fresh_data')
+        if self.sync_status_label.text() in (self.STARTUP_SYNC_STATUS, self.STARTUP_SYNC_FAILED_STATUS):
+            self.set_sync_status("")
     
-    def handle_update_complete(self):
+    def handle_update_complete(self, changed):
         """Handle when update check is complete"""
         self.update_in_progress = False
+        if self.first_sync_pending and self.sync_status_label.text() == self.STARTUP_SYNC_STATUS:
+            # The share couldn't be read, the next check tries again
+            self.set_sync_status(self.STARTUP_SYNC_FAILED_STATUS, error=True)
+        
+        # Check often while other users are editing, back off up to 5 minutes when nothing changes
+        if changed:
+            self.update_interval = self.UPDATE_INTERVAL_MIN
+        else:
+            self.update_interval = min(self.update_interval * 2, self.UPDATE_INTERVAL_MAX)
+        self.update_timer.setInterval(self.update_interval)
 
-    def save_shared_data_with_retry(self, max_retries=3):
-        """Save shared data with retry logic"""
-        for attempt in range(max_retries):
-            try:
-                if self.save_shared_data_to_smb():
-                    return True
-            except Exception as e:
-                print(f"Save attempt {attempt + 1} failed: {str(e)}")
-                if attempt == max_retries - 1:
-                    QMessageBox.critical(self, "Napaka", 
-                        f"Ni mogoče shraniti podatkov po {max_retries} poskusih. "
-                        "Preverite povezavo z SMB strežnikom.")
-                    return False
-                import time
-                time.sleep(1)  # Wait before retry
-        return False
+    def save_shared_data_with_retry(self):
+        """Queue local changes for upload, a burst of edits is uploaded once after a short quiet period"""
+        self.sync_timer.start(self.SYNC_DELAY)
+        self.set_sync_status("Shranjevanje sprememb ...")
+
+    def flush_shared_data(self):
+        """Start uploading the queued changes on a SharedDataSaveWorker"""
+        if self.save_worker and self.save_worker.isRunning():
+            # Changes made during an upload go out when it finishes
+            self.sync_timer.start(self.SYNC_DELAY)
+            return
+        if self.first_sync_pending:
+            # Wait for the share's data, local edits are then applied on top of it and uploaded
+            self.sync_timer.start(self.SYNC_DELAY)
+            return
+        
+        try:
+            tables, ops = self.prepare_shared_changes()
+        except Exception as e:
+            print(f"Error preparing shared data changes: {str(e)}")
+            return
+        if not ops:
+            self.set_sync_status("")
+            return
+        
+        self.save_worker = SharedDataSaveWorker(self, tables, ops)
+        self.save_worker.save_complete.connect(self.handle_save_complete)
+        self.save_worker.start()
+
+    def handle_save_complete(self, worker):
+        """Handle the end of an upload (runs on main thread)"""
+        if worker.handled:
+            return
+        worker.handled = True
+        
+        if worker.result is None:
+            # Keep the changes queued and try again later
+            self.set_sync_status("Sinhronizacija ni uspela, ponoven poskus čez 1 minuto", error=True)
+            self.sync_timer.start(self.SYNC_RETRY_DELAY)
+            return
+        
+        version, up_to_date = worker.result
+        self.finish_shared_upload(worker.tables, worker.ops, version, up_to_date)
+        if not self.sync_timer.isActive():
+            self.set_sync_status("")
+
+    def set_sync_status(self, text, error=False):
+        """Show the state of the shared data upload in the status bar"""
+        self.sync_status_label.setText(text)
+        self.sync_status_label.setStyleSheet("color: red;" if error else "")
     
     def closeEvent(self, event):
         """Clean up worker thread when closing the application"""
@@ -4232,6 +5579,39 @@ class MainWindow(QMainWindow):
                     self.update_worker.stop()
                     self.update_worker.wait(2000)  # Wait up to 2 seconds
             
+            # Upload local changes that are still queued
+            if hasattr(self, 'sync_timer'):
+                self.sync_timer.stop()
+                if self.save_worker and self.save_worker.isRunning():
+                    self.save_worker.wait(15000)
+                if self.save_worker and self.save_worker.isRunning():
+                    # Still uploading, its operations must not be sent a second time
+                    print("Shared data upload still running, remaining changes are not uploaded")
+                else:
+                    if self.save_worker:
+                        self.handle_save_complete(self.save_worker)
+                        self.sync_timer.stop()
+                    self.save_shared_data_to_smb()
+            
+            # Cancel a running report calculation
+            if hasattr(self, 'report_worker') and self.report_worker:
+                if self.report_worker.isRunning():
+                    self.report_worker.stop()
+                    self.report_worker.wait(2000)
+            
+            # Stop writing roll-ups before the sessions and the cache are closed
+            if hasattr(self, 'compaction_thread'):
+                self.compaction_stop.set()
+                self.compaction_thread.join(10)
+            
+            # Close pooled SMB sessions
+            if hasattr(self, 'smb_pool'):
+                self.smb_pool.close_all()
+            
+            # Close the local time_records cache
+            if hasattr(self, 'records_cache'):
+                self.records_cache.close()
+            
             # Close database connection
             if hasattr(self, 'conn'):
                 self.conn.close()